@@ -1,103 +1,105 @@
 import { useEffect, useState } from "react";
-import { getAllProduct } from "../../services/apis/productApi";
-import { getAllOrder } from "../../services/apis/orderApi";
-import type { RevenueCard } from "../../interfaces/interface";
+import type {
+    DashboardSummary,
+    MetricsDelta,
+    OrderStatus,
+    RevenueCard,
+} from "../../interfaces/interface";
 import { Box, Typography } from "@mui/material";
-import { getAllCustomer } from "../../services/apis/customerApi";
+import {
+    getDashboardSummary,
+    subscribeToEvents,
+} from "../../services/apis/dashboardApi";
+
+// Adds a metrics.delta event to the summary it was computed against.
+const applyDelta = (
+    summary: DashboardSummary,
+    delta: MetricsDelta
+): DashboardSummary => {
+    const ordersByStatus = { ...summary.orders_by_status };
+    for (const [status, count] of Object.entries(
+        delta.orders_by_status ?? {}
+    )) {
+        const key = status as OrderStatus;
+        ordersByStatus[key] = (ordersByStatus[key] ?? 0) + (count ?? 0);
+    }
+    const products = { ...summary.products };
+    for (const [key, count] of Object.entries(delta.products ?? {})) {
+        const field = key as keyof DashboardSummary["products"];
+        products[field] += count ?? 0;
+    }
+
+    return {
+        ...summary,
+        orders_this_month:
+            summary.orders_this_month + (delta.orders_this_month ?? 0),
+        revenue_this_month:
+            Number(summary.revenue_this_month) +
+            Number(delta.revenue_this_month ?? 0),
+        orders_by_status: ordersByStatus,
+        total_customers:
+            summary.total_customers + (delta.total_customers ?? 0),
+        products,
+    };
+};
 
 const DashboardMetrics = () => {
-    const [revenue, setRevenue] = useState<RevenueCard[]>([]);
+    const [summary, setSummary] = useState<DashboardSummary | null>(null);
 
     useEffect(() => {
         const fetchMetrics = async () => {
             try {
-                const [orderResponse, productResponse, customerResponse] =
-                    await Promise.all([
-                        getAllOrder(1, true),
-                        getAllProduct(1, true),
-                        getAllCustomer(1, true),
-                    ]);
-
-                const orders = Array.isArray(orderResponse)
-                    ? orderResponse
-                    : orderResponse?.results ?? [];
-
-                const products = Array.isArray(productResponse)
-                    ? productResponse
-                    : productResponse?.results ?? [];
-
-                const customers = Array.isArray(customerResponse)
-                    ? customerResponse
-                    : customerResponse?.results ?? [];
-
-                const now = new Date();
-
-                const ordersThisMonth = orders.filter((order) => {
-                    const orderDate = new Date(order.date);
-                    return (
-                        orderDate.getMonth() === now.getMonth() &&
-                        orderDate.getFullYear() === now.getFullYear()
-                    );
-                });
-
-                const revenueThisMonth = ordersThisMonth.reduce(
-                    (sum: number, order) => {
-                        const orderTotal = order.items.reduce(
-                            (
-                                itemSum: number,
-                                item: {
-                                    price_at_order_time: number;
-                                    quantity: number;
-                                }
-                            ) =>
-                                itemSum +
-                                item.price_at_order_time * item.quantity,
-                            0
-                        );
-                        return sum + orderTotal;
-                    },
-                    0
-                );
-
-                const activeProducts = products.filter(
-                    (product) => product.stock > 0
-                );
-
-                const formatted: RevenueCard[] = [
-                    {
-                        id: 1,
-                        heading: "Order This Month",
-                        number: ordersThisMonth.length,
-                    },
-                    {
-                        id: 2,
-                        heading: "Revenue This Month",
-                        number: `$${revenueThisMonth.toLocaleString("en-US", {
-                            minimumFractionDigits: 2,
-                            maximumFractionDigits: 2,
-                        })}`,
-                    },
-                    {
-                        id: 3,
-                        heading: "Active Products",
-                        number: activeProducts.length,
-                    },
-                    {
-                        id: 4,
-                        heading: "Total Customers",
-                        number: customers.length,
-                    },
-                ];
-
-                setRevenue(formatted);
+                const summary = await getDashboardSummary();
+                if (!summary) return;
+                setSummary(summary);
             } catch (error) {
                 console.error("Error fetching dashboard metrics:", error);
             }
         };
 
         fetchMetrics();
+        return subscribeToEvents((type, data) => {
+            if (type === "metrics.delta") {
+                setSummary((current) =>
+                    current ? applyDelta(current, data as MetricsDelta) : current
+                );
+            } else if (type === "resync") {
+                fetchMetrics();
+            }
+        });
     }, []);
 
+    const revenue: RevenueCard[] = summary
+        ? [
+              {
+                  id: 1,
+                  heading: "Order This Month",
+                  number: summary.orders_this_month,
+              },
+              {
+                  id: 2,
+                  heading: "Revenue This Month",
+                  number: `$${Number(summary.revenue_this_month).toLocaleString(
+                      "en-US",
+                      {
+                          minimumFractionDigits: 2,
+                          maximumFractionDigits: 2,
+                      }
+                  )}`,
+              },
+              {
+                  id: 3,
+                  heading: "Active Products",
+                  number: summary.products.active,
+              },
+              {
+                  id: 4,
+                  heading: "Total Customers",
+                  number: summary.total_customers,
+              },
+          ]
+        : [];
+
     return (
         <>
             {revenue?.map((card) => (
@@ -10,6 +10,7 @@ export interface Product {
     stock: number;
     status: string;
     units_sold?: number;
+    reorder_threshold?: number;
     id?: number;
     created_at?: string | undefined;
     updated_at?: string | undefined;
@@ -113,3 +114,51 @@ export interface RevenueCard {
     heading: string;
     number: string | number;
 }
+
+export interface DashboardSummary {
+    orders_this_month: number;
+    revenue_this_month: number;
+    monthly_revenue: { month: string; revenue: number }[];
+    orders_by_status: Record<OrderStatus, number>;
+    total_customers: number;
+    products: {
+        total: number;
+        active: number;
+        low_stock: number;
+        out_of_stock: number;
+    };
+}
+
+export interface StockAlert {
+    id: number;
+    product: number;
+    product_name: string;
+    level: "in_stock" | "low_stock" | "out_of_stock";
+    stock: number;
+    threshold: number;
+    created_at: string;
+}
+
+export interface StockAlertPage {
+    results: StockAlert[];
+    last: number | null;
+}
+
+export interface MetricsDelta {
+    orders_this_month?: number;
+    revenue_this_month?: string | number;
+    orders_by_status?: Partial<Record<OrderStatus, number>>;
+    total_customers?: number;
+    products?: Partial<DashboardSummary["products"]>;
+}
+
+export type LiveEventType =
+    | "ready"
+    | "resync"
+    | "order.created"
+    | "order.updated"
+    | "order.deleted"
+    | "stock.changed"
+    | "metrics.delta";
+
+export type LiveEventListener = (type: LiveEventType, data: any) => void;
@@ -3,82 +3,78 @@ import MonthlyRevenueChart from "../components/home/MonthlyRevenueChart";
 import TopSelling from "../components/home/TopSelling";
 import LowStockWarning from "../components/home/LowStockWarning";
 import RecentOrders from "../components/home/RecentOrders";
-import { useEffect, useState } from "react";
-import type {
-    MonthlyRevenue,
-    OrderResponse,
-    Product,
-} from "../interfaces/interface";
+import { useCallback, useEffect, useState } from "react";
+import type { MonthlyRevenue, Product } from "../interfaces/interface";
 import { getAllProduct } from "../services/apis/productApi";
-import { getAllOrder } from "../services/apis/orderApi";
+import {
+    getDashboardSummary,
+    getStockAlerts,
+    subscribeToEvents,
+} from "../services/apis/dashboardApi";
 import DashboardMetrics from "../components/home/DashboardMetrics";
 
-const LOW_STOCK_THRESHOLD = 10;
+// The alert outbox is cheap to poll; the list is only refetched on new alerts
+// or, where the live event stream is served, on stock changes.
+const ALERT_POLL_INTERVAL = 30000;
 
 const Dashboard = () => {
     const [lowStockProducts, setLowStockProducts] = useState<Product[]>([]);
     const [data, setData] = useState<MonthlyRevenue[]>([]);
 
-    useEffect(() => {
-        const fetchLowStockProducts = async () => {
-            try {
-                const allProductsResponse = await getAllProduct(1, true);
+    const fetchLowStockProducts = useCallback(async () => {
+        try {
+            const response = await getAllProduct(1, true, "below threshold");
 
-                if (allProductsResponse && Array.isArray(allProductsResponse)) {
-                    const filtered = allProductsResponse.filter(
-                        (product) => product.stock < LOW_STOCK_THRESHOLD
-                    );
-                    setLowStockProducts(filtered);
-                } else {
-                    console.error("No products array found in response");
-                }
-            } catch (error) {
-                console.error("Error fetching product data:", error);
+            if (response && Array.isArray(response)) {
+                setLowStockProducts(response);
+            } else {
+                console.error("No products array found in response");
             }
-        };
-
-        const fetchMonthlyRevenue = async () => {
-            try {
-                const response = await getAllOrder(1, true);
-                if (!response) throw new Error("Failed to fetch orders");
-
-                const orders: OrderResponse[] = Array.isArray(response)
-                    ? response
-                    : response.results;
-
-                if (!orders) throw new Error("Orders data missing");
-
-                const monthlyMap = new Map<string, number>();
+        } catch (error) {
+            console.error("Error fetching product data:", error);
+        }
+    }, []);
 
-                orders.forEach((order) => {
-                    const date = new Date(order.date);
-                    const label = date.toLocaleString("default", {
-                        month: "short",
-                        year: "numeric",
-                    });
+    useEffect(() => {
+        let last: number | null = null;
+        const pollAlerts = async () => {
+            const page = await getStockAlerts(last);
+            if (!page) return;
+            if (last !== null && page.results.length > 0) {
+                fetchLowStockProducts();
+            }
+            last = page.last ?? last;
+        };
 
-                    const total = order.items.reduce((sum, item) => {
-                        return sum + item.price_at_order_time * item.quantity;
-                    }, 0);
+        pollAlerts();
+        const interval = setInterval(pollAlerts, ALERT_POLL_INTERVAL);
+        return () => clearInterval(interval);
+    }, [fetchLowStockProducts]);
 
-                    if (monthlyMap.has(label)) {
-                        monthlyMap.set(label, monthlyMap.get(label)! + total);
-                    } else {
-                        monthlyMap.set(label, total);
-                    }
-                });
+    useEffect(
+        () =>
+            subscribeToEvents((type) => {
+                if (type === "stock.changed" || type === "resync") {
+                    fetchLowStockProducts();
+                }
+            }),
+        [fetchLowStockProducts]
+    );
 
-                const formattedData: MonthlyRevenue[] = Array.from(
-                    monthlyMap,
-                    ([label, value]) => ({
-                        label,
-                        value: parseFloat(value.toFixed(2)),
-                    })
-                ).sort(
-                    (a, b) =>
-                        new Date(`1 ${a.label}`).getTime() -
-                        new Date(`1 ${b.label}`).getTime()
-                );
+    useEffect(() => {
+        const fetchMonthlyRevenue = async () => {
+            try {
+                const summary = await getDashboardSummary();
+                if (!summary) throw new Error("Failed to fetch revenue");
+
+                const formattedData: MonthlyRevenue[] =
+                    summary.monthly_revenue.map(({ month, revenue }) => ({
+                        label: new Date(`${month}-01T00:00:00`).toLocaleString(
+                            "default",
+                            { month: "short", year: "numeric" }
+                        ),
+                        value: parseFloat(Number(revenue).toFixed(2)),
+                    }));
 
                 setData(formattedData);
             } catch (error) {
@@ -88,7 +84,7 @@ const Dashboard = () => {
 
         fetchLowStockProducts();
         fetchMonthlyRevenue();
-    }, []);
+    }, [fetchLowStockProducts]);
 
     return (
         <Box
@@ -0,0 +1,114 @@
+import toast from "react-hot-toast";
+import apiConnector from "../apiConnector";
+import type {
+    DashboardSummary,
+    LiveEventListener,
+    LiveEventType,
+    StockAlertPage,
+} from "../../interfaces/interface";
+import { getAccessToken } from "./productApi";
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+
+export const getDashboardSummary =
+    async (): Promise<DashboardSummary | null> => {
+        try {
+            const token = getAccessToken();
+
+            const response = await apiConnector(
+                "GET",
+                `${API_BASE_URL}/dashboard/summary/`,
+                undefined,
+                {
+                    "Content-Type": "application/json",
+                    Authorization: `Bearer ${token}`,
+                }
+            );
+
+            if (response.status !== 200) {
+                throw new Error("Dashboard summary fetching failed!");
+            }
+
+            return response.data as DashboardSummary;
+        } catch (error: any) {
+            console.error("Get dashboard summary error:", error);
+            toast.error("Failed to fetch dashboard summary!");
+            return null;
+        }
+    };
+
+export const getStockAlerts = async (
+    after?: number | null
+): Promise<StockAlertPage | null> => {
+    try {
+        const token = getAccessToken();
+        const query = after != null ? `?after=${after}` : "";
+
+        const response = await apiConnector(
+            "GET",
+            `${API_BASE_URL}/alerts/${query}`,
+            undefined,
+            {
+                "Content-Type": "application/json",
+                Authorization: `Bearer ${token}`,
+            }
+        );
+
+        if (response.status !== 200) {
+            throw new Error("Stock alerts fetching failed!");
+        }
+
+        return response.data as StockAlertPage;
+    } catch (error: any) {
+        console.error("Get stock alerts error:", error);
+        return null;
+    }
+};
+
+const LIVE_EVENT_TYPES: LiveEventType[] = [
+    "ready",
+    "resync",
+    "order.created",
+    "order.updated",
+    "order.deleted",
+    "stock.changed",
+    "metrics.delta",
+];
+
+// One stream is shared by every listener of the page.
+let eventSource: EventSource | null = null;
+const listeners = new Set<LiveEventListener>();
+
+// Calls `listener` with the tenant's live events and returns the unsubscribe
+// function. A "ready" event follows every (re)connection and "resync" a
+// stream that fell behind: listeners reload what they show on both. Servers
+// without the ASGI stream answer 404 and the source simply stays closed.
+export const subscribeToEvents = (listener: LiveEventListener) => {
+    if (!eventSource) {
+        let token: string;
+        try {
+            token = getAccessToken();
+        } catch (error) {
+            console.error("Live events error:", error);
+            return () => {};
+        }
+        // EventSource cannot send headers, so the token goes in the query.
+        token = encodeURIComponent(token);
+        eventSource = new EventSource(`${API_BASE_URL}/events/?token=${token}`);
+        for (const type of LIVE_EVENT_TYPES) {
+            eventSource.addEventListener(type, (event) => {
+                const data = JSON.parse((event as MessageEvent).data);
+                listeners.forEach((notify) => notify(type, data));
+            });
+        }
+    }
+    listeners.add(listener);
+
+    return () => {
+        listeners.delete(listener);
+        if (listeners.size === 0 && eventSource) {
+            eventSource.close();
+            eventSource = null;
+        }
+    };
+};
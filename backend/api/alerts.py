@@ -0,0 +1,53 @@
+"""Low-stock alerts, raised when a write moves a product to another stock level.
+
+A product is out of stock at zero, low at or below its
+``reorder_threshold`` and in stock above it. The writes that change stock
+(orders taking or returning it, manual edits of the stock or threshold)
+compare the level before and after from the rows they already hold, and
+``record()`` appends a ``StockAlert`` for each change in the same
+transaction. The table is the outbox the dashboard polls with
+``?after=<last id>``; live streams get the same level changes as
+``stock.changed`` events (see ``api.events``).
+"""
+
+from .models import StockAlert
+
+
+def level(stock, threshold):
+    if stock <= 0:
+        return StockAlert.OUT_OF_STOCK
+    if stock <= threshold:
+        return StockAlert.LOW_STOCK
+    return StockAlert.IN_STOCK
+
+
+def change(product, stock, threshold):
+    """A ``StockAlert`` if ``product`` changes level at this stock and threshold."""
+    after = level(stock, threshold)
+    if after == level(product.stock, product.reorder_threshold):
+        return None
+    return StockAlert(
+        created_by_id=product.created_by_id,
+        product_id=product.pk,
+        level=after,
+        stock=stock,
+        threshold=threshold,
+    )
+
+
+def crossings(products, deltas):
+    """Alerts for ``products`` (as read before the write) taking ``deltas`` units."""
+    alerts = []
+    for pk, delta in deltas.items():
+        product = products[pk]
+        alert = change(product, product.stock - delta, product.reorder_threshold)
+        if alert is not None:
+            alerts.append(alert)
+    return alerts
+
+
+def record(alerts):
+    """Store alerts in the outbox, in the current transaction."""
+    alerts = [alert for alert in alerts if alert is not None]
+    if alerts:
+        StockAlert.objects.bulk_create(alerts)
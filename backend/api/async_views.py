@@ -0,0 +1,268 @@
+"""Async GET handlers for the read-heavy endpoints, used when served over ASGI.
+
+They run the same querysets and serializers as the views in ``views.py``,
+with the queries issued through the async ORM. Requests they do not cover
+(search, rankings, streaming, cursor pages) and every write are handed to
+the sync DRF views. ``event_stream`` serves the live events, which need an
+event loop to wait on.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+
+from . import caching, events
+from .authentication import StatelessJWTAuthentication, auser_state
+from .conditional import aconditional
+from .models import Product
+from .renderers import dumps
+from .serializers import CustomerSerializer, OrderSerializer, ProductSerializer
+from .views import (
+    adashboard_summary,
+    customer_detail_state,
+    customer_list_state,
+    customer_queryset,
+    filtered_customers,
+    filtered_orders,
+    filtered_products,
+    order_detail_state,
+    order_list_state,
+    order_queryset,
+    product_detail_state,
+    product_list_state,
+    recent_orders_state,
+)
+
+# Query parameters whose handling only exists in the sync views, which also
+# do the content negotiation for non-JSON formats.
+SYNC_ONLY_PARAMS = {"q", "top", "all", "cursor"}
+
+jwt = StatelessJWTAuthentication()
+
+
+def render(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+async def authenticate(request, raw_token=None):
+    """``StatelessJWTAuthentication`` with the user check run on the async ORM.
+
+    ``raw_token`` is used when the request has no Authorization header.
+    """
+    header = jwt.get_header(request)
+    if header is not None:
+        raw_token = jwt.get_raw_token(header)
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+    token = jwt.get_validated_token(raw_token)
+    user_id = jwt.user_id(token)
+    return jwt.user_for(token, user_id, await auser_state(user_id))
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.page_size)
+        # Paginator.count is a cached_property; fill it without a sync query.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise exceptions.NotFound(
+                self.invalid_page_message.format(page_number=page_number, message=exc)
+            )
+        return [obj async for obj in self.page.object_list]
+
+
+async def paginated(request, queryset, serializer_class, page_size):
+    paginator = AsyncPageNumberPagination()
+    paginator.page_size = page_size
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={"request": request})
+    response = paginator.get_paginated_response(serializer.data)
+    return response.data
+
+
+def async_get(handler, state=None, cached=False):
+    """Build an async GET view from ``handler(request, *args) -> data``.
+
+    Wraps it in authentication, the conditional-GET check against
+    ``state`` and, with ``cached``, the shared response cache.
+    """
+
+    async def view(request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            drf_request.user = await authenticate(request)
+
+            async def respond():
+                data = await handler(drf_request, *args, **kwargs)
+                if isinstance(data, HttpResponse):
+                    return None, data
+                return data, render(data)
+
+            async def respond_cached():
+                if cached:
+                    return await caching.acached(drf_request, respond, render)
+                return (await respond())[1]
+
+            if state is None:
+                return await respond_cached()
+            return await aconditional(
+                request, state(drf_request, *args, **kwargs), respond_cached
+            )
+        except exceptions.APIException as exc:
+            return error_response(drf_request, exc)
+
+    return view
+
+
+def error_response(request, exc):
+    # Same body shape as DRF's exception_handler.
+    detail = exc.detail
+    if not isinstance(detail, (list, dict)):
+        detail = {"detail": detail}
+    response = render(detail, status=exc.status_code)
+    if isinstance(exc, exceptions.NotAuthenticated | exceptions.AuthenticationFailed):
+        response["WWW-Authenticate"] = jwt.authenticate_header(request)
+    return response
+
+
+def with_async_get(get, view):
+    """Serve GET/HEAD from the async ``get`` and anything else from ``view``."""
+    sync_view = sync_to_async(view)
+
+    async def dispatch(request, *args, **kwargs):
+        if (
+            request.method in ("GET", "HEAD")
+            and not SYNC_ONLY_PARAMS & request.GET.keys()
+            and "msgpack" not in request.headers.get("Accept", "")
+        ):
+            return await get(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+
+    return csrf_exempt(dispatch)
+
+
+def not_found(name):
+    return render({"detail": f"{name} not found"}, status=404)
+
+
+async def product_list(request):
+    products = ProductSerializer.shape_queryset(filtered_products(request), request)
+    return await paginated(request, products.order_by("id"), ProductSerializer, 10)
+
+
+async def product_detail(request, pk):
+    products = Product.objects.filter(created_by=request.user)
+    product = (
+        await ProductSerializer.shape_queryset(products, request).filter(pk=pk).afirst()
+    )
+    if not product:
+        return not_found("Product")
+    return ProductSerializer(product, context={"request": request}).data
+
+
+async def customer_list(request):
+    customers = filtered_customers(request)
+    return await paginated(request, customers, CustomerSerializer, 10)
+
+
+async def customer_detail(request, pk):
+    customer = await customer_queryset(request).filter(pk=pk).afirst()
+    if not customer:
+        return not_found("Customer")
+    return CustomerSerializer(customer, context={"request": request}).data
+
+
+async def order_list(request):
+    return await paginated(request, filtered_orders(request), OrderSerializer, 4)
+
+
+async def order_detail(request, pk):
+    order = await order_queryset(request).filter(pk=pk).afirst()
+    if not order:
+        return not_found("Order")
+    return OrderSerializer(order, context={"request": request}).data
+
+
+async def recent_orders(request):
+    orders = order_queryset(request).order_by("-created_at")[:10]
+    orders = [order async for order in orders]
+    return OrderSerializer(orders, many=True, context={"request": request}).data
+
+
+async def dashboard_summary(request):
+    return await adashboard_summary(request.user)
+
+
+product_list_view = async_get(product_list, product_list_state, cached=True)
+product_detail_view = async_get(product_detail, product_detail_state, cached=True)
+customer_list_view = async_get(customer_list, customer_list_state, cached=True)
+customer_detail_view = async_get(customer_detail, customer_detail_state, cached=True)
+order_list_view = async_get(order_list, order_list_state)
+order_detail_view = async_get(order_detail, order_detail_state)
+recent_orders_view = async_get(recent_orders, recent_orders_state)
+dashboard_summary_view = async_get(dashboard_summary)
+
+
+async def event_stream(request):
+    """The tenant's live events (see ``api.events``) as ``text/event-stream``.
+
+    ``EventSource`` cannot send headers, so the access token may also be
+    passed as ``?token=``. The stream opens with a ``ready`` event, after
+    which a client (re)loads what it displays, and stays open with a comment
+    every ``API_EVENTS_HEARTBEAT`` seconds.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        user = await authenticate(request, request.GET.get("token"))
+    except exceptions.APIException as exc:
+        return error_response(Request(request), exc)
+
+    # Subscribed before the response starts, so no event falls in between.
+    # Django calls EventStream.close() when the response ends or the client
+    # disconnects.
+    stream = EventStream(events.get_broker().subscribe(user.pk))
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+class EventStream:
+    """Server-Sent Events messages for a broker subscription."""
+
+    def __init__(self, subscription):
+        self.subscription = subscription
+        self.started = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.started:
+            self.started = True
+            return b"retry: 5000\nevent: ready\ndata: {}\n\n"
+        try:
+            event = await asyncio.wait_for(
+                self.subscription.queue.get(), settings.API_EVENTS_HEARTBEAT
+            )
+        except asyncio.TimeoutError:
+            return b": keep-alive\n\n"
+        return b"event: %s\ndata: %s\n\n" % (
+            event["type"].encode(),
+            dumps(event["data"]),
+        )
+
+    def close(self):
+        self.subscription.close()
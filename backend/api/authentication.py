@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _cached_state(user_id):
+    """(found, state) from the LRU; expired entries count as missing."""
+    with _states_lock:
+        entry = _states.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return False, None
+        _states.move_to_end(user_id)
+        return True, entry[1]
+
+
+def _store_state(user_id, state):
+    with _states_lock:
+        _states[user_id] = (time.monotonic() + settings.API_AUTH_USER_TTL, state)
+        _states.move_to_end(user_id)
+        while len(_states) > settings.API_AUTH_USER_CACHE_SIZE:
+            _states.popitem(last=False)
+    return state
+
+
+def _user_state_query(user_id):
+    return User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(
+        "is_active", "is_staff", "password", "email"
+    )
+
+
+def user_state(user_id):
+    """``(is_active, is_staff, password hash, email)`` of a user, or None."""
+    found, state = _cached_state(user_id)
+    if found:
+        return state
+    return _store_state(user_id, _user_state_query(user_id).first())
+
+
+async def auser_state(user_id):
+    found, state = _cached_state(user_id)
+    if found:
+        return state
+    return _store_state(user_id, await _user_state_query(user_id).afirst())
+
+
+def forget(user_id):
+    """Drop a user's cached state so the next request reads it again."""
+    with _states_lock:
+        _states.pop(user_id, None)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the token for the user's identity.
+
+    ``request.user`` is a ``User`` carrying only its primary key, email and
+    staff flag, which is all the views use it for (``created_by`` filters and
+    writes, the ``created_by`` email in responses, staff-only endpoints). Whether the user still exists and is
+    active is cached per process, with the email, for
+    ``API_AUTH_USER_TTL`` seconds, so most requests run no user query.
+    Saving or deleting a user clears its entry in the current process;
+    other processes see the change when their entry expires.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        return self.user_for(validated_token, user_id, user_state(user_id))
+
+    def user_id(self, validated_token):
+        # The claim is a string; the cache and forget() are keyed by the pk.
+        field = User._meta.get_field(api_settings.USER_ID_FIELD)
+        try:
+            return field.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def user_for(self, validated_token, user_id, state):
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        is_active, is_staff, password, email = state
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        user = User(
+            **{api_settings.USER_ID_FIELD: user_id},
+            is_active=is_active,
+            is_staff=is_staff,
+            email=email,
+        )
+        user._state.adding = False
+        user._state.db = User.objects.db
+        return user
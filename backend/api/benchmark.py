@@ -0,0 +1,288 @@
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.db import connections
+from django.test import Client, RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import renderers, rows
+from .models import Customer, Order, Product
+from .serializers import CustomerSerializer, OrderSerializer, ProductSerializer
+
+DEFAULT_ENDPOINTS = [
+    "/api/products/",
+    "/api/products/?status=low stock",
+    "/api/products/?top=true",
+    "/api/products/?q=Product 1",
+    "/api/products/?cursor=",
+    "/api/customers/",
+    "/api/customers/?exclude=orders",
+    "/api/orders/",
+    "/api/orders/?status=pending",
+    "/api/orders/?expand=customer.orders",
+    "/api/orders/recent/",
+    "/api/dashboard/summary/",
+]
+
+
+def order_bodies(user, seed=0):
+    """Random three-line orders over the user's best-stocked products."""
+    customers = list(
+        Customer.objects.filter(created_by=user).values_list("pk", flat=True)[:1000]
+    )
+    products = list(
+        Product.objects.filter(created_by=user)
+        .order_by("-stock")
+        .values_list("pk", flat=True)[:1000]
+    )
+    rng = random.Random(seed)
+
+    def body():
+        return {
+            "customer_id": rng.choice(customers),
+            "items": [
+                {"product_id": pk, "quantity": 1, "price_at_order_time": "0"}
+                for pk in rng.sample(products, min(3, len(products)))
+            ],
+        }
+
+    return body
+
+
+# Request bodies for the write endpoints the runner knows how to drive.
+BODIES = {("POST", "/api/orders/"): order_bodies}
+
+
+def parse_endpoint(spec):
+    """``"/api/orders/"`` or ``"POST /api/orders/"`` -> (method, path)."""
+    method, _, path = spec.strip().rpartition(" ")
+    return (method.upper() or "GET"), path
+
+
+def client_sender(token):
+    """Send requests in-process through Django's test client, one per thread."""
+    local = threading.local()
+
+    def send(method, path, body=None):
+        client = getattr(local, "client", None)
+        if client is None:
+            # Server errors are counted like any other failed response.
+            client = local.client = Client(
+                raise_request_exception=False,
+                SERVER_NAME="localhost",
+                HTTP_AUTHORIZATION=f"Bearer {token}",
+            )
+        if body is None:
+            response = client.generic(method, path)
+        else:
+            response = client.generic(
+                method, path, json.dumps(body), content_type="application/json"
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+    return send
+
+
+def http_sender(base_url, token):
+    """Send requests to a running server, e.g. runserver, gunicorn or uvicorn."""
+    base_url = base_url.rstrip("/")
+
+    def send(method, path, body=None):
+        headers = {"Authorization": f"Bearer {token}"}
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            base_url + urllib.parse.quote(path, safe="/?=&,."),
+            data=body,
+            headers=headers,
+            method=method,
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    return send
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Latency and throughput of ``samples``; all zero when there are none."""
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    if not latencies:
+        return {
+            "requests": 0,
+            "errors": 0,
+            "throughput_rps": 0.0,
+            **dict.fromkeys(["mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"], 0.0),
+        }
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+def run_endpoint(send, spec, requests, concurrency, warmup=0, body=None):
+    """Issue ``requests`` calls to ``spec`` from ``concurrency`` threads."""
+    method, path = parse_endpoint(spec)
+
+    def call():
+        return send(method, path, body() if body else None)
+
+    for _ in range(warmup):
+        call()
+
+    remaining = [requests]
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                status = call()
+                sample = (time.perf_counter() - started, status)
+                with lock:
+                    samples.append(sample)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - started)
+
+
+def run(
+    send,
+    endpoints,
+    requests=100,
+    concurrency=1,
+    warmup=5,
+    bodies=None,
+    mixed=False,
+):
+    """Benchmark each endpoint and return {spec: summary}.
+
+    Endpoints run one after another, or all at once with ``mixed`` so that
+    reads and writes contend with each other as they do in production.
+    ``bodies`` maps (method, path) to a callable producing request bodies.
+    """
+    bodies = bodies or {}
+
+    def bench(spec):
+        return run_endpoint(
+            send, spec, requests, concurrency, warmup, bodies.get(parse_endpoint(spec))
+        )
+
+    if not mixed:
+        return {spec: bench(spec) for spec in endpoints}
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda spec=spec: results.update({spec: bench(spec)}))
+        for spec in endpoints
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {spec: results[spec] for spec in endpoints}
+
+
+# Querysets rendered by the list endpoints, as the views build them.
+SERIALIZED = {
+    "orders": (Order, OrderSerializer),
+    "products": (Product, ProductSerializer),
+    "customers": (Customer, CustomerSerializer),
+}
+
+
+def serialization_paths(request, model, serializer_class, limit):
+    """{name: callable returning the response body} for each way to render."""
+    queryset = serializer_class.shape_queryset(
+        model.objects.filter(created_by=request.user), request
+    ).order_by("id")[:limit]
+    plan = rows.plan_for(serializer_class, request)
+
+    def drf():
+        return serializer_class(
+            queryset.all(), many=True, context={"request": request}
+        ).data
+
+    def plain_rows():
+        return plan.render(list(plan.values(queryset.all())))
+
+    paths = {
+        "drf+json": lambda: JSONRenderer().render(drf()),
+        "drf+orjson": lambda: renderers.dumps(drf()),
+    }
+    if plan is not None:
+        paths["rows+orjson"] = lambda: renderers.dumps(plain_rows())
+        if renderers.msgpack is not None:
+            paths["rows+msgpack"] = lambda: renderers.MessagePackRenderer().render(
+                plain_rows()
+            )
+    return paths
+
+
+def serialization(user, resource, query="", limit=10000, repeat=3):
+    """Rows per second from queryset to response bytes, best of ``repeat``.
+
+    Each path renders the same rows; their bodies are checked to match.
+    """
+    model, serializer_class = SERIALIZED[resource]
+    request = Request(RequestFactory().get(f"/api/{resource}/?{query}"))
+    request.user = user
+    paths = serialization_paths(request, model, serializer_class, limit)
+
+    count = min(limit, model.objects.filter(created_by=user).count())
+    results = {}
+    expected = None
+    for name, render in paths.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = render()
+            timings.append(time.perf_counter() - started)
+        if name.endswith("json"):
+            expected = expected or body
+            if body != expected:
+                raise AssertionError(f"{name} rendered a different body")
+        best = min(timings)
+        results[name] = {
+            "seconds": round(best, 3),
+            "rows_per_second": round(count / best),
+            "bytes": len(body),
+        }
+    return {"rows": count, "paths": results}
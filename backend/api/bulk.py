@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching, events, inventory, rollups, totals
+from .models import Customer, Order, OrderedItem, Product, StockMovement
+from .serializers import BulkOrderSerializer
+
+BATCH_SIZE = 500
+
+
+def create_orders(user, entries):
+    """Validate and insert many orders at once.
+
+    Returns one result per entry, in request order. Entries are accepted
+    first-come against the stock locked at the start of the batch; a
+    rejected entry does not affect the others.
+    """
+    results = [None] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        serializer = BulkOrderSerializer(data=entry)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "errors": serializer.errors,
+            }
+
+    customer_ids = {data["customer_id"] for _, data in valid}
+    product_ids = {item["product_id"] for _, data in valid for item in data["items"]}
+
+    with transaction.atomic():
+        customers = set(
+            Customer.objects.filter(created_by=user, pk__in=customer_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        products = (
+            Product.objects.select_for_update()
+            .filter(created_by=user)
+            .in_bulk(list(product_ids))
+        )
+        remaining = {pk: product.stock for pk, product in products.items()}
+
+        accepted = []
+        taken = {}
+        now = timezone.now()
+        for index, data in valid:
+            quantities = inventory.count_quantities(data["items"])
+            canceled = data["status"] == Order.CANCELED
+            errors = []
+            if data["customer_id"] not in customers:
+                errors.append(f"Customer {data['customer_id']} does not exist.")
+            for pk, quantity in quantities.items():
+                if pk not in products:
+                    errors.append(f"Product {pk} does not exist.")
+                elif not canceled and remaining[pk] < quantity:
+                    errors.append(
+                        f"Not enough stock for product {products[pk].name}. Available: {remaining[pk]}, required: {quantity}"
+                    )
+            if errors:
+                results[index] = {"index": index, "status": "error", "errors": errors}
+                continue
+
+            quantities_taken = {} if canceled else quantities
+            for pk, quantity in quantities_taken.items():
+                remaining[pk] -= quantity
+                taken[pk] = taken.get(pk, 0) + quantity
+            order = Order(
+                created_by=user,
+                customer_id=data["customer_id"],
+                status=data["status"],
+                date=data.get("date", now),
+                total_items=sum(quantities.values()),
+                total_amount=sum(
+                    products[pk].price * quantity for pk, quantity in quantities.items()
+                ),
+            )
+            accepted.append((index, order, quantities, quantities_taken))
+
+        Order.objects.bulk_create(
+            [order for _, order, _, _ in accepted], batch_size=BATCH_SIZE
+        )
+        items = [
+            OrderedItem(
+                order=order,
+                product_id=pk,
+                quantity=quantity,
+                price_at_order_time=products[pk].price,
+            )
+            for _, order, quantities, _ in accepted
+            for pk, quantity in quantities.items()
+        ]
+        OrderedItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        inventory.apply_stock_deltas(taken, products)
+        StockMovement.objects.bulk_create(
+            [
+                movement
+                for _, order, _, quantities_taken in accepted
+                for movement in inventory.movements(
+                    quantities_taken, user.pk, StockMovement.ORDER, order
+                )
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        rollups.record_items(items)
+        totals.refresh_customers({order.customer_id for _, order, _, _ in accepted})
+        caching.bump_on_commit(user.pk)
+        # bulk_create sends no post_save, so the events are published here.
+        orders = [order for _, order, _, _ in accepted]
+        events.send(
+            user.pk,
+            [
+                *[("order.created", events.order_data(order)) for order in orders],
+                (
+                    "metrics.delta",
+                    events.order_metrics(
+                        [(None, order.summary_state()) for order in orders]
+                    ),
+                ),
+            ],
+        )
+
+    for index, order, _, _ in accepted:
+        results[index] = {
+            "index": index,
+            "status": "created",
+            "id": order.pk,
+            "order_id": str(order.order_id),
+        }
+    return results
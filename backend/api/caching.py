@@ -0,0 +1,134 @@
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+_stats = {"hits": 0, "misses": 0, "hit_seconds": 0.0, "miss_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _version_key(user_id):
+    return f"api:tenant:{user_id}:version"
+
+
+def _new_version():
+    # Random rather than counted: the file-based cache's incr() is a
+    # read-modify-write that concurrent processes can lose, and a version
+    # evicted from the cache must not come back as one already used.
+    return uuid.uuid4().hex
+
+
+def tenant_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), _new_version(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+async def atenant_version(user_id):
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        await cache.aadd(_version_key(user_id), _new_version(), None)
+        version = await cache.aget(_version_key(user_id))
+    return version
+
+
+def bump(user_id):
+    """Invalidate every cached response of a tenant.
+
+    A single set(), which every cache backend applies atomically.
+    """
+    cache.set(_version_key(user_id), _new_version(), None)
+
+
+def bump_on_commit(user_id):
+    # Bumping before commit would let a concurrent reader cache the old rows
+    # under the new version.
+    transaction.on_commit(lambda: bump(user_id))
+
+
+def cached_get(view_method):
+    """Read-through cache for an APIView ``get`` returning a DRF ``Response``.
+
+    Keys combine the tenant's version, the path and the sorted query params.
+    Streaming and non-200 responses are passed through uncached.
+    """
+
+    @wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        started = time.perf_counter()
+        key = _response_key(request, tenant_version(request.user.pk))
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            _record("hits", "hit_seconds", started)
+            return response
+
+        response = view_method(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            response["X-Cache"] = "MISS"
+            _record("misses", "miss_seconds", started)
+        return response
+
+    return wrapper
+
+
+async def acached(request, respond, render):
+    """Async counterpart of ``cached_get``.
+
+    ``respond()`` returns ``(data, response)`` and ``render(data)`` rebuilds a
+    response from cached data. Entries are shared with the sync views.
+    """
+    started = time.perf_counter()
+    key = _response_key(request, await atenant_version(request.user.pk))
+
+    data = await cache.aget(key)
+    if data is not None:
+        response = render(data)
+        response["X-Cache"] = "HIT"
+        _record("hits", "hit_seconds", started)
+        return response
+
+    data, response = await respond()
+    if response.status_code == 200:
+        await cache.aset(key, data, settings.API_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        _record("misses", "miss_seconds", started)
+    return response
+
+
+def _response_key(request, version):
+    params = sorted(request.query_params.lists())
+    digest = hashlib.md5(f"{request.path}?{params}".encode()).hexdigest()
+    return f"api:tenant:{request.user.pk}:{version}:{digest}"
+
+
+def _record(counter, timer, started):
+    with _stats_lock:
+        _stats[counter] += 1
+        _stats[timer] += time.perf_counter() - started
+
+
+def stats():
+    """Hit rate and mean latency of cached views in this process."""
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        hit_seconds, miss_seconds = _stats["hit_seconds"], _stats["miss_seconds"]
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0.0,
+        "avg_hit_ms": hit_seconds * 1000 / hits if hits else 0.0,
+        "avg_miss_ms": miss_seconds * 1000 / misses if misses else 0.0,
+    }
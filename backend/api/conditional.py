@@ -0,0 +1,85 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+FINGERPRINT = {"count": Count("pk"), "last": Max("updated_at")}
+
+
+def fingerprint(querysets):
+    """ETag and Last-Modified for the rows behind a response.
+
+    Each queryset contributes its row count and newest ``updated_at``, read
+    with one aggregate query answered from the ``(created_by, updated_at)``
+    indexes; nothing is serialized. Counts catch deletions, which leave no
+    newer timestamp behind.
+    """
+    return _validators(
+        [queryset.order_by().aggregate(**FINGERPRINT) for queryset in querysets]
+    )
+
+
+async def afingerprint(querysets):
+    return _validators(
+        [await queryset.order_by().aaggregate(**FINGERPRINT) for queryset in querysets]
+    )
+
+
+def _validators(rows):
+    counts = [row["count"] for row in rows]
+    stamps = [row["last"] for row in rows if row["last"]]
+    last_modified = max(stamps) if stamps else None
+    stamp = last_modified.isoformat() if last_modified else ""
+    etag = hashlib.md5(f"{counts}:{stamp}".encode()).hexdigest()
+    return etag, last_modified
+
+
+def conditional_get(state):
+    """Answer ``If-None-Match``/``If-Modified-Since`` with 304 for an APIView ``get``.
+
+    ``state(request, *args, **kwargs)`` returns the querysets whose rows make
+    up the response.
+    """
+
+    def decorator(view_method):
+        def validators(request, *args, **kwargs):
+            if not hasattr(request, "_conditional_state"):
+                request._conditional_state = fingerprint(
+                    state(request, *args, **kwargs)
+                )
+            return request._conditional_state
+
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            # Each representation (JSON, MessagePack, ...) gets its own ETag.
+            suffix = request.accepted_renderer.format
+            suffix = "" if suffix == "json" else f"-{suffix}"
+            conditional = condition(
+                etag_func=lambda *a, **kw: validators(*a, **kw)[0] + suffix,
+                last_modified_func=lambda *a, **kw: validators(*a, **kw)[1],
+            )(lambda req, *a, **kw: view_method(view, req, *a, **kw))
+            return conditional(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def aconditional(request, querysets, respond):
+    """Async counterpart of ``conditional_get`` for a plain async view.
+
+    ``respond()`` is awaited only when the client's copy is stale.
+    """
+    etag, last_modified = await afingerprint(querysets)
+    etag = quote_etag(etag)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = await respond()
+        response.headers.setdefault("ETag", etag)
+        if timestamp is not None:
+            response.headers.setdefault("Last-Modified", http_date(timestamp))
+    return response
@@ -0,0 +1,201 @@
+"""Per-tenant live events for the dashboard's Server-Sent Events stream.
+
+Committed writes become events in ``api.signals``: ``order.created``,
+``order.updated`` and ``order.deleted``, ``stock.changed``, and
+``metrics.delta`` carrying what changed in the dashboard summary. They are
+handed to the broker from ``get_broker()``, chosen with
+``API_EVENTS_BROKER``. ``LocalBroker`` fans them out to the streams open in
+this process, which is all a single ASGI worker needs; a broker shared by
+several processes (Redis pub/sub, Postgres LISTEN/NOTIFY, ...) implements
+the same ``publish()`` and ``subscribe()``, the latter returning an object
+with a ``queue`` and a synchronous ``close()``.
+
+A stream that falls too far behind gets a ``resync`` event in place of
+the ones it missed, telling the client to fetch the lists again.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import alerts
+from .models import StockAlert
+
+RESYNC = {"type": "resync", "data": {}}
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class LocalBroker:
+    """Delivers events to the subscribers of the current process."""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.API_EVENTS_QUEUE_SIZE
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, tenant_id, event):
+        """Queue ``event`` for the tenant's open streams; callable from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(tenant_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(offer, subscription.queue, event)
+            except RuntimeError:
+                # The stream's event loop has already closed.
+                pass
+
+    def subscribe(self, tenant_id):
+        """A ``Subscription`` to the tenant's events, open until closed."""
+        subscription = Subscription(self, tenant_id)
+        with self._lock:
+            self._subscribers[tenant_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.tenant_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.tenant_id, None)
+
+
+class Subscription:
+    """An ``asyncio.Queue`` of events for the running event loop.
+
+    ``close()`` is synchronous and idempotent, so it can run from a
+    response's close() as well as from ``async with``.
+    """
+
+    def __init__(self, broker, tenant_id):
+        self.broker = broker
+        self.tenant_id = tenant_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(broker.queue_size)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self):
+        return self.queue
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+def offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.API_EVENTS_BROKER)()
+    return _broker
+
+
+def send(tenant_id, events):
+    """Publish ``[(type, data), ...]`` to a tenant once the transaction commits."""
+    events = [{"type": kind, "data": data} for kind, data in events if data]
+    if not events:
+        return
+
+    def publish():
+        broker = get_broker()
+        for event in events:
+            broker.publish(tenant_id, event)
+
+    transaction.on_commit(publish)
+
+
+def order_data(order):
+    return {
+        "id": order.pk,
+        "order_id": str(order.order_id),
+        "customer": order.customer_id,
+        "status": order.status,
+        "date": order.date,
+        "total_items": order.total_items,
+        "total_amount": order.total_amount,
+    }
+
+
+def order_metrics(changes):
+    """Summary deltas for ``[(state before, state after), ...]`` of orders.
+
+    States are dicts with the order's ``status``, ``date`` and
+    ``total_amount``, the fields the dashboard summary counts; None stands
+    for no order (created or deleted).
+    """
+    month_start = timezone.localdate().replace(day=1)
+    orders_by_status = defaultdict(int)
+    orders_this_month = 0
+    revenue_this_month = Decimal(0)
+    for before, after in changes:
+        for state, sign in [(before, -1), (after, 1)]:
+            if state is None:
+                continue
+            orders_by_status[state["status"]] += sign
+            if timezone.localdate(state["date"]) >= month_start:
+                orders_this_month += sign
+                revenue_this_month += sign * Decimal(state["total_amount"])
+
+    delta = {}
+    if orders_this_month:
+        delta["orders_this_month"] = orders_this_month
+    if revenue_this_month:
+        delta["revenue_this_month"] = revenue_this_month
+    orders_by_status = {key: value for key, value in orders_by_status.items() if value}
+    if orders_by_status:
+        delta["orders_by_status"] = orders_by_status
+    return delta
+
+
+def product_metrics(levels):
+    """Summary deltas for ``[(level before, level after), ...]`` of products.
+
+    None stands for no product (created or deleted).
+    """
+    counts = defaultdict(int)
+    for before, after in levels:
+        for level, sign in [(before, -1), (after, 1)]:
+            if level is None:
+                continue
+            if before is None or after is None:
+                counts["total"] += sign
+            if level != StockAlert.OUT_OF_STOCK:
+                counts["active"] += sign
+            if level == StockAlert.LOW_STOCK:
+                counts["low_stock"] += sign
+            if level == StockAlert.OUT_OF_STOCK:
+                counts["out_of_stock"] += sign
+    counts = {key: value for key, value in counts.items() if value}
+    return {"products": counts} if counts else {}
+
+
+def stock_events(changes):
+    """Events for ``[(product pk, (stock, threshold) before, after), ...]``."""
+    products = []
+    levels = []
+    for pk, before, after in changes:
+        level = alerts.level(*after)
+        products.append({"id": pk, "stock": after[0], "level": level})
+        levels.append((alerts.level(*before), level))
+    return [
+        ("stock.changed", {"products": products} if products else None),
+        ("metrics.delta", product_metrics(levels)),
+    ]
@@ -0,0 +1,213 @@
+from collections import defaultdict
+
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import alerts, signals
+from .models import Product, StockMovement, StockSnapshot
+
+# Every key written adds a term to the WHERE and CASE expressions of an
+# UPDATE, and SQLite rejects expression trees deeper than 1000, so large
+# writes are split into UPDATEs of at most this many keys.
+UPDATE_CHUNK_SIZE = 300
+
+
+def chunks(mapping, size=UPDATE_CHUNK_SIZE):
+    """Split a dict into dicts of at most ``size`` items."""
+    items = list(mapping.items())
+    for start in range(0, len(items), size):
+        yield dict(items[start : start + size])
+
+
+def count_quantities(items_data):
+    """Collapse order lines into {product_id: total quantity}."""
+    quantities = defaultdict(int)
+    for item in items_data:
+        quantities[item["product_id"]] += item["quantity"]
+    return dict(quantities)
+
+
+def lock_products(product_ids, user_id):
+    """Fetch and row-lock the user's products in one query."""
+    products = (
+        Product.objects.select_for_update()
+        .filter(created_by_id=user_id)
+        .in_bulk(list(product_ids))
+    )
+    missing = sorted(set(product_ids) - products.keys())
+    if missing:
+        raise serializers.ValidationError(
+            {"items": [f"Product {pk} does not exist." for pk in missing]}
+        )
+    return products
+
+
+def check_stock(products, quantities, released=None):
+    """Validate every requested quantity before anything is written."""
+    released = released or {}
+    errors = []
+    for pk, quantity in quantities.items():
+        product = products[pk]
+        available = product.stock + released.get(pk, 0)
+        if available < quantity:
+            errors.append(
+                f"Not enough stock for product {product.name}. Available: {available}, required: {quantity}"
+            )
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
+def apply_stock_deltas(deltas, products=None):
+    """Take (positive) or return (negative) stock for many products in bulk UPDATEs.
+
+    The WHERE clause only matches rows that still have enough stock, so a
+    concurrent writer that got there first makes the row count come up short
+    and the surrounding transaction is rolled back.
+
+    ``products`` are the locked rows as read before the write; with them,
+    the products whose stock level changes get a low-stock alert.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    updated = 0
+    now = timezone.now()
+    for chunk in chunks(deltas):
+        updated += update_stock(chunk, now)
+    if updated != len(deltas):
+        raise serializers.ValidationError(
+            "Stock changed while the order was being saved. Please try again."
+        )
+    if products is not None:
+        alerts.record(alerts.crossings(products, deltas))
+        changes = []
+        for pk, delta in deltas.items():
+            product = products[pk]
+            threshold = product.reorder_threshold
+            changes.append(
+                (pk, (product.stock, threshold), (product.stock - delta, threshold))
+            )
+        signals.stock_changed.send(
+            sender=Product,
+            tenant_id=products[next(iter(deltas))].created_by_id,
+            changes=changes,
+        )
+
+
+def update_stock(deltas, now):
+    guard = Q()
+    for pk, delta in deltas.items():
+        guard |= Q(pk=pk, stock__gte=delta) if delta > 0 else Q(pk=pk)
+
+    return Product.objects.filter(guard).update(
+        stock=Case(
+            *[When(pk=pk, then=F("stock") - delta) for pk, delta in deltas.items()],
+            default=F("stock"),
+            output_field=IntegerField(),
+        ),
+        units_sold=Greatest(
+            Case(
+                *[
+                    When(pk=pk, then=F("units_sold") + delta)
+                    for pk, delta in deltas.items()
+                ],
+                default=F("units_sold"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        updated_at=now,
+    )
+
+
+def movements(deltas, user_id, reason, order=None):
+    """Ledger rows for ``deltas``, in the same units-taken sense as above."""
+    now = timezone.now()
+    return [
+        StockMovement(
+            created_at=now,
+            created_by_id=user_id,
+            product_id=pk,
+            order=order,
+            reason=reason,
+            quantity=-delta,
+        )
+        for pk, delta in deltas.items()
+        if delta
+    ]
+
+
+def record_movements(deltas, user_id, reason, order=None):
+    StockMovement.objects.bulk_create(movements(deltas, user_id, reason, order))
+
+
+def stock_at(product_ids, when=None):
+    """Return {product_id: stock} as of ``when`` (default: now).
+
+    Starts from each product's latest snapshot taken by then and adds the
+    ledger rows recorded after it, all in one query.
+    """
+    snapshots = StockSnapshot.objects.filter(product_id=OuterRef("pk"))
+    moved = StockMovement.objects.filter(
+        product_id=OuterRef("pk"), id__gt=OuterRef("since")
+    )
+    if when is not None:
+        snapshots = snapshots.filter(taken_at__lte=when)
+        moved = moved.filter(created_at__lte=when)
+    snapshots = snapshots.order_by("-taken_at", "-id")
+    moved = moved.values("product_id").annotate(total=Sum("quantity")).values("total")
+
+    rows = (
+        Product.objects.filter(pk__in=list(product_ids))
+        .annotate(
+            base=Coalesce(Subquery(snapshots.values("stock")[:1]), 0),
+            since=Coalesce(Subquery(snapshots.values("movement_id")[:1]), 0),
+        )
+        .annotate(moved=Coalesce(Subquery(moved), 0))
+        .values_list("pk", "base", "moved")
+    )
+    return {pk: base + moved for pk, base, moved in rows}
+
+
+def take_snapshots(user=None, batch_size=1000):
+    """Snapshot current stock for every product (or one user's) and return the count.
+
+    Call inside a transaction so the stock read matches the last movement id.
+    """
+    last_movement = StockMovement.objects.aggregate(last=Max("id"))["last"] or 0
+    products = Product.objects.all()
+    if user is not None:
+        products = products.filter(created_by=user)
+
+    now = timezone.now()
+    count = 0
+    batch = []
+    for pk, stock in products.values_list("pk", "stock").iterator(
+        chunk_size=batch_size
+    ):
+        batch.append(
+            StockSnapshot(
+                product_id=pk, stock=stock, movement_id=last_movement, taken_at=now
+            )
+        )
+        if len(batch) >= batch_size:
+            StockSnapshot.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    StockSnapshot.objects.bulk_create(batch)
+    return count + len(batch)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import User
+from api.totals import backfill
+
+
+class Command(BaseCommand):
+    help = "Recompute stored order totals and customer lifetime stats."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only recompute rows for this user email.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        with transaction.atomic():
+            orders, customers = backfill(user=user)
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated {orders} orders and {customers} customers")
+        )
@@ -0,0 +1,105 @@
+import json
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import benchmark
+from api.models import User
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Measure p50/p95/p99 latency and throughput per API endpoint as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", help="Email to authenticate as (default: most orders)."
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help=(
+                "Path to benchmark, optionally prefixed by a method such as "
+                "'POST /api/orders/'; repeat for several (default: main lists)."
+            ),
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--mixed",
+            action="store_true",
+            help="Run all endpoints at the same time instead of one by one.",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Benchmark a running server instead of the in-process client.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+        else:
+            user = (
+                User.objects.annotate(orders=Count("order")).order_by("-orders").first()
+            )
+        if user is None:
+            raise CommandError("No user to benchmark as; run generate_data first")
+
+        endpoints = options["endpoints"] or benchmark.DEFAULT_ENDPOINTS
+        bodies = {}
+        for spec in endpoints:
+            method, path = benchmark.parse_endpoint(spec)
+            if method == "GET":
+                continue
+            if (method, path) not in benchmark.BODIES:
+                raise CommandError(f"No request body generator for {spec}")
+            bodies[method, path] = benchmark.BODIES[method, path](user)
+
+        token = str(RefreshToken.for_user(user).access_token)
+        if options["base_url"]:
+            send = benchmark.http_sender(options["base_url"], token)
+        else:
+            send = benchmark.client_sender(token)
+
+        report = {
+            "commit": current_commit(),
+            "started_at": timezone.now().isoformat(),
+            "target": options["base_url"] or "test-client",
+            "user": user.email,
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "mixed": options["mixed"],
+            "database": connection.vendor,
+            "sqlite_profile": settings.SQLITE_PROFILE,
+            "endpoints": benchmark.run(
+                send,
+                endpoints,
+                requests=options["requests"],
+                concurrency=options["concurrency"],
+                warmup=options["warmup"],
+                bodies=bodies,
+                mixed=options["mixed"],
+            ),
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from api import benchmark
+from api.management.commands.benchmark_api import current_commit
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/sec rendered by the DRF serializers and the row fast path, "
+        "with the stdlib JSON, orjson and MessagePack renderers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", help="Email of the tenant to render (default: most orders)."
+        )
+        parser.add_argument(
+            "--resource",
+            action="append",
+            dest="resources",
+            choices=sorted(benchmark.SERIALIZED),
+            help="Repeat for several (default: all).",
+        )
+        parser.add_argument(
+            "--query",
+            default="",
+            help="Query string applied to the serializers, e.g. 'exclude=orders'.",
+        )
+        parser.add_argument("--limit", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(email=options["user"]).first()
+        else:
+            user = (
+                User.objects.annotate(orders=Count("order")).order_by("-orders").first()
+            )
+        if user is None:
+            raise CommandError("No user to benchmark as; run generate_data first")
+
+        report = {
+            "commit": current_commit(),
+            "started_at": timezone.now().isoformat(),
+            "user": user.email,
+            "query": options["query"],
+            "limit": options["limit"],
+            "resources": {
+                resource: benchmark.serialization(
+                    user,
+                    resource,
+                    options["query"],
+                    options["limit"],
+                    options["repeat"],
+                )
+                for resource in options["resources"] or benchmark.SERIALIZED
+            },
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as report_file:
+                report_file.write(output + "\n")
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import User
+from api.totals import check
+
+
+class Command(BaseCommand):
+    help = "Report orders and customers whose stored totals have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only check rows for this user email.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        drifted = 0
+        for model, pk, drift in check(user=user):
+            drifted += 1
+            fields = ", ".join(
+                f"{name} stored {stored} expected {expected}"
+                for name, (stored, expected) in drift.items()
+            )
+            self.stdout.write(f"{model} {pk}: {fields}")
+        if drifted:
+            raise CommandError(
+                f"{drifted} rows drifted; run backfill_totals to repair them"
+            )
+        self.stdout.write(self.style.SUCCESS("Stored totals are consistent"))
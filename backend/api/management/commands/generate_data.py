@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate synthetic users with products, customers and orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1)
+        parser.add_argument("--products", type=int, default=1000, help="Per user.")
+        parser.add_argument("--customers", type=int, default=1000, help="Per user.")
+        parser.add_argument("--orders", type=int, default=10000, help="Per user.")
+        parser.add_argument("--days", type=int, default=365, help="Order date range.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="password")
+
+    def handle(self, *args, **options):
+        if min(options["products"], options["customers"]) < 1:
+            raise CommandError("--products and --customers must be at least 1")
+
+        started = time.perf_counter()
+        try:
+            counts = generate(
+                options["users"],
+                options["products"],
+                options["customers"],
+                options["orders"],
+                days=options["days"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                password=options["password"],
+                log=self.stdout.write,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {model}" for model, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {elapsed:.1f}s"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import User
+from api.rankings import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the top-selling product rankings from ordered items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild rankings for this user email.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        with transaction.atomic():
+            count = rebuild(user=user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} product ranking rows"))
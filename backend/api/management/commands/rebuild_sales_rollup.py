@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import User
+from api.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySales rollup table from ordered items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild rows for this user email.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        with transaction.atomic():
+            count = rebuild(user=user, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily sales rows"))
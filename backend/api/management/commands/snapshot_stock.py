@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.inventory import take_snapshots
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Snapshot current product stock so ledger lookups start from it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only snapshot this user's products.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(email=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        with transaction.atomic():
+            count = take_snapshots(user=user, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Took {count} stock snapshots"))
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+# SQLite-only: FTS5 tables mirroring the searchable columns, kept in sync by
+# triggers so that bulk_create()/update()/queryset deletes are covered too.
+# Other backends use the icontains fallback in api/search.py.
+SEARCH_TABLES = {
+    "api_product_fts": ("api_product", {"name": "name", "sku": "SKU"}),
+    "api_customer_fts": (
+        "api_customer",
+        {"name": "name", "email": "email", "phone": "phone"},
+    ),
+}
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, (source, columns) in SEARCH_TABLES.items():
+        fts_columns = ", ".join(columns)
+        source_columns = ", ".join(f'"{column}"' for column in columns.values())
+        new_values = ", ".join(f'new."{column}"' for column in columns.values())
+        assignments = ", ".join(
+            f'{fts} = new."{column}"' for fts, column in columns.items()
+        )
+        for statement in [
+            f"CREATE VIRTUAL TABLE {table} USING fts5("
+            f"{fts_columns}, created_by_id UNINDEXED, tokenize='trigram')",
+            f"INSERT INTO {table} (rowid, {fts_columns}, created_by_id) "
+            f"SELECT id, {source_columns}, created_by_id FROM {source}",
+            f"CREATE TRIGGER {table}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {table} (rowid, {fts_columns}, created_by_id) "
+            f"VALUES (new.id, {new_values}, new.created_by_id); END",
+            f"CREATE TRIGGER {table}_au AFTER UPDATE OF {source_columns}, "
+            f"created_by_id ON {source} BEGIN UPDATE {table} SET {assignments}, "
+            f"created_by_id = new.created_by_id WHERE rowid = old.id; END",
+            f"CREATE TRIGGER {table}_ad AFTER DELETE ON {source} BEGIN "
+            f"DELETE FROM {table} WHERE rowid = old.id; END",
+        ]:
+            schema_editor.execute(statement)
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, (source, _) in SEARCH_TABLES.items():
+        for suffix in ["ai", "au", "ad"]:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:29
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    """Fill the new columns from existing order lines, as api.totals.backfill."""
+    Customer = apps.get_model("api", "Customer")
+    Order = apps.get_model("api", "Order")
+    OrderedItem = apps.get_model("api", "OrderedItem")
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    zero = Decimal("0.00")
+
+    lines = (
+        OrderedItem.objects.filter(order_id=OuterRef("pk"))
+        .values("order_id")
+        .annotate(
+            total=Sum(F("price_at_order_time") * F("quantity"), output_field=amount)
+        )
+        .values("total")
+    )
+    Order.objects.update(
+        total_amount=Coalesce(Subquery(lines), zero, output_field=amount)
+    )
+
+    orders = (
+        Order.objects.filter(customer_id=OuterRef("pk"))
+        .exclude(status="canceled")
+        .values("customer_id")
+    )
+    Customer.objects.update(
+        order_count=Coalesce(
+            Subquery(orders.annotate(count=Count("pk")).values("count")), 0
+        ),
+        lifetime_value=Coalesce(
+            Subquery(
+                orders.annotate(value=Sum("total_amount", output_field=amount)).values(
+                    "value"
+                )
+            ),
+            zero,
+            output_field=amount,
+        ),
+        last_order_at=Subquery(orders.annotate(last=Max("date")).values("last")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_stock_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="last_order_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="lifetime_value",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="order_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total_amount",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["created_by", "lifetime_value"], name="customer_owner_value_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["created_by", "order_count"], name="customer_owner_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["created_by", "last_order_at"],
+                name="customer_owner_last_order_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_product_rankings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[
+                            ("in_stock", "In stock"),
+                            ("low_stock", "Low stock"),
+                            ("out_of_stock", "Out of stock"),
+                        ],
+                        max_length=15,
+                    ),
+                ),
+                ("stock", models.PositiveIntegerField()),
+                ("threshold", models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reorder_threshold",
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("stock__lte", models.F("reorder_threshold"))),
+                fields=["created_by", "stock"],
+                name="product_owner_below_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockalert",
+            name="created_by",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddField(
+            model_name="stockalert",
+            name="product",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="alerts",
+                to="api.product",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockalert",
+            index=models.Index(fields=["created_by", "id"], name="alert_owner_idx"),
+        ),
+    ]
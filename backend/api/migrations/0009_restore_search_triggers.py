@@ -0,0 +1,26 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# SQLite applies some schema changes by copying the table into a new one,
+# which drops its triggers. 0006 and 0008 did so for api_customer and
+# api_product, so the FTS tables stopped following writes. They are rebuilt
+# here from the current rows, with their triggers. A later migration that
+# remakes either table must run this again.
+search_index = import_module("api.migrations.0003_search_index")
+
+
+def rebuild_search_tables(apps, schema_editor):
+    search_index.drop_search_tables(apps, schema_editor)
+    search_index.create_search_tables(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_stock_alerts"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_tables, migrations.RunPython.noop),
+    ]
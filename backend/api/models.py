@@ -64,6 +64,30 @@ class Product(BaseModel):
     stock = models.PositiveIntegerField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="active")
     units_sold = models.PositiveIntegerField(default=0)
+    # Stock at or below this is low; see api.alerts.
+    reorder_threshold = models.PositiveIntegerField(default=10)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_by", "status"], name="product_owner_status_idx"
+            ),
+            models.Index(
+                fields=["created_by", "stock"], name="product_owner_stock_idx"
+            ),
+            # Holds only the products at or below their threshold.
+            models.Index(
+                fields=["created_by", "stock"],
+                condition=models.Q(stock__lte=models.F("reorder_threshold")),
+                name="product_owner_below_idx",
+            ),
+            models.Index(
+                fields=["created_by", "-units_sold"], name="product_owner_sold_idx"
+            ),
+            models.Index(
+                fields=["created_by", "updated_at"], name="product_owner_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.SKU}"
@@ -74,12 +98,34 @@ class Customer(BaseModel):
     email = models.EmailField()
     phone = models.CharField(max_length=15)
     address = models.TextField()
+    # Maintained by api.totals over the customer's non-canceled orders.
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_by", "updated_at"], name="customer_owner_updated_idx"
+            ),
+            models.Index(
+                fields=["created_by", "lifetime_value"], name="customer_owner_value_idx"
+            ),
+            models.Index(
+                fields=["created_by", "order_count"], name="customer_owner_count_idx"
+            ),
+            models.Index(
+                fields=["created_by", "last_order_at"],
+                name="customer_owner_last_order_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Order(BaseModel):
+    CANCELED = "canceled"
     STATUS_CHOICES = (
         ("pending", "Pending"),
         ("processing", "Processing"),
@@ -95,6 +141,39 @@ class Order(BaseModel):
     )
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default="pending")
     total_items = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_by", "status"], name="order_owner_status_idx"
+            ),
+            models.Index(
+                fields=["created_by", "-created_at"], name="order_owner_created_idx"
+            ),
+            models.Index(fields=["created_by", "date"], name="order_owner_date_idx"),
+            models.Index(
+                fields=["created_by", "updated_at"], name="order_owner_updated_idx"
+            ),
+        ]
+
+    # The fields the dashboard summary counts an order by. Their values as
+    # loaded are kept so api.signals can publish what a save changed.
+    SUMMARY_FIELDS = ("status", "date", "total_amount")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(name in loaded for name in cls.SUMMARY_FIELDS):
+            order._summary_state = {name: loaded[name] for name in cls.SUMMARY_FIELDS}
+        return order
+
+    def summary_state(self):
+        """The summary fields' current values; None if any is deferred."""
+        if self.get_deferred_fields() & set(self.SUMMARY_FIELDS):
+            return None
+        return {name: getattr(self, name) for name in self.SUMMARY_FIELDS}
 
     def __str__(self):
         return str(self.order_id)
@@ -108,3 +187,180 @@ class OrderedItem(models.Model):
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
+
+
+class DailySales(models.Model):
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    day = models.DateField()
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["created_by", "day", "product"], name="unique_daily_sales"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}: {self.units}"
+
+
+class StockMovement(models.Model):
+    """One append-only change to a product's stock.
+
+    ``quantity`` is the signed change: negative when stock leaves, positive
+    when it comes back.
+    """
+
+    ORDER = "order"
+    EDIT = "edit"
+    CANCELLATION = "cancellation"
+    ADJUSTMENT = "adjustment"
+    REASON_CHOICES = (
+        (ORDER, "Order placed"),
+        (EDIT, "Order edited"),
+        (CANCELLATION, "Order canceled"),
+        (ADJUSTMENT, "Manual adjustment"),
+    )
+
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="movements"
+    )
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="movements",
+    )
+    reason = models.CharField(max_length=15, choices=REASON_CHOICES)
+    quantity = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "created_at"], name="movement_product_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """A product's stock as of ``movement_id``, the last ledger row it includes."""
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    stock = models.IntegerField()
+    movement_id = models.PositiveBigIntegerField(default=0)
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "-taken_at"], name="snapshot_product_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.stock} at {self.taken_at}"
+
+
+class RankingWindow(models.Model):
+    """The period a tenant's ``ProductRanking`` rows for one window cover.
+
+    Rows count orders dated on or after ``start`` (every order when it is
+    null). The rolling windows' ``start`` is moved forward by
+    ``rankings.advance()``.
+    """
+
+    ALL_TIME = "all"
+    LAST_30_DAYS = "30d"
+    THIS_MONTH = "month"
+    WINDOW_CHOICES = (
+        (ALL_TIME, "All time"),
+        (LAST_30_DAYS, "Last 30 days"),
+        (THIS_MONTH, "This month"),
+    )
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    start = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["created_by", "window"], name="unique_ranking_window"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.created_by_id} {self.window} from {self.start}"
+
+
+class ProductRanking(models.Model):
+    """Units of a product sold in non-canceled orders within one window."""
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    window = models.CharField(max_length=10, choices=RankingWindow.WINDOW_CHOICES)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="rankings"
+    )
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["created_by", "window", "product"],
+                name="unique_product_ranking",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["created_by", "window", "units", "product"],
+                name="product_ranking_units_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.window} - {self.product_id}: {self.units}"
+
+
+class StockAlert(models.Model):
+    """A product's stock moving to another level, kept as a pollable outbox.
+
+    Rows are only appended; clients read the ones after the last ``id``
+    they have seen.
+    """
+
+    IN_STOCK = "in_stock"
+    LOW_STOCK = "low_stock"
+    OUT_OF_STOCK = "out_of_stock"
+    LEVEL_CHOICES = (
+        (IN_STOCK, "In stock"),
+        (LOW_STOCK, "Low stock"),
+        (OUT_OF_STOCK, "Out of stock"),
+    )
+
+    created_at = models.DateTimeField(default=timezone.now)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="alerts"
+    )
+    level = models.CharField(max_length=15, choices=LEVEL_CHOICES)
+    stock = models.PositiveIntegerField()
+    threshold = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_by", "id"], name="alert_owner_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.level} ({self.stock}/{self.threshold})"
@@ -0,0 +1,173 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.serialize = 0.0
+        self.render_started = None
+        self.render = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+    @property
+    def sql(self):
+        return sum(duration for duration, _ in self.queries)
+
+
+def timed_data(prop):
+    """Wrap a serializer ``data`` property to add its time to the profile."""
+
+    def data(serializer):
+        profile = current_profile.get()
+        if profile is None:
+            return prop.fget(serializer)
+        started = time.perf_counter()
+        try:
+            return prop.fget(serializer)
+        finally:
+            profile.serialize += time.perf_counter() - started
+
+    return property(data)
+
+
+def execute(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; times the current request."""
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.execute(execute, sql, params, many, context)
+
+
+def add_execute_wrapper(connection, **kwargs):
+    if execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute)
+
+
+def install():
+    """Time ``.data`` on every serializer and every query.
+
+    Nested serializers render inside the outer ``.data``. The query wrapper
+    goes on each connection as it is created, in whichever thread: async
+    views run their queries in ``sync_to_async`` threads, which inherit the
+    request's ``current_profile``.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data, "_profiled", False):
+            cls.data = timed_data(cls.data)
+            cls.data.fget._profiled = True
+    connection_created.connect(add_execute_wrapper)
+    for connection in connections.all(initialized_only=True):
+        add_execute_wrapper(connection)
+
+
+class ProfilingMiddleware:
+    """Per-request SQL, serialization and render timings.
+
+    Enabled by ``API_PROFILING``; otherwise Django drops the middleware at
+    startup. Timings go out as a ``Server-Timing`` header, and requests slower
+    than ``API_SLOW_REQUEST_MS`` are logged as JSON with their slowest
+    queries. Serialization time includes the lazy queries it triggers.
+
+    Runs in the handler's own mode, so async views under ASGI are measured
+    without being adapted to sync.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "API_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = settings.API_SLOW_REQUEST_MS
+        self.slowest = settings.API_SLOW_QUERY_COUNT
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = Profile()
+        token = current_profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = current_profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        if profile.render_started is not None:
+            profile.render = time.perf_counter() - profile.render_started
+        response["Server-Timing"] = ", ".join(
+            [
+                f'sql;dur={profile.sql * 1000:.1f};desc="{len(profile.queries)} queries"',
+                f"serialize;dur={profile.serialize * 1000:.1f}",
+                f"render;dur={profile.render * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        if total * 1000 >= self.slow_ms:
+            self.log_slow(request, response, profile, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns.
+        profile = current_profile.get()
+        if profile is not None:
+            profile.render_started = time.perf_counter()
+        return response
+
+    def log_slow(self, request, response, profile, total):
+        slowest = sorted(profile.queries, key=lambda query: query[0], reverse=True)
+        user = getattr(request, "user", None)
+        logger.warning(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "status": response.status_code,
+                    "user": getattr(user, "pk", None),
+                    "total_ms": round(total * 1000, 1),
+                    "sql_ms": round(profile.sql * 1000, 1),
+                    "queries": len(profile.queries),
+                    "serialize_ms": round(profile.serialize * 1000, 1),
+                    "render_ms": round(profile.render * 1000, 1),
+                    "slowest_queries": [
+                        {"ms": round(duration * 1000, 2), "sql": sql}
+                        for duration, sql in slowest[: self.slowest]
+                    ],
+                }
+            )
+        )
@@ -0,0 +1,254 @@
+"""Per-tenant top-selling products over all time, the last 30 days and this month.
+
+For every tenant and window, ``ProductRanking`` holds the units each
+product sold in non-canceled orders dated inside the window, and
+``RankingWindow.start`` the first day it covers. Order writes apply their
+lines with ``record_items()``, alongside the daily rollup. The rolling
+windows move forward lazily: ``advance()`` subtracts the lines of the days
+that left the window the next time it is read. ``top()`` is then one range
+scan of the ``(created_by, window, units)`` index, whatever the number of
+products or orders.
+
+A tenant's rankings are built from its order lines on first use, and
+``rebuild()`` recomputes them.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import caching, inventory
+from .models import Order, OrderedItem, Product, ProductRanking, RankingWindow
+
+WINDOWS = [window for window, _ in RankingWindow.WINDOW_CHOICES]
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 100
+
+
+def window_start(window, today=None):
+    """First day ``window`` covers as of ``today``; None for all time."""
+    today = today or timezone.localdate()
+    if window == RankingWindow.LAST_30_DAYS:
+        return today - timedelta(days=29)
+    if window == RankingWindow.THIS_MONTH:
+        return today.replace(day=1)
+    return None
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def sold_units(user_id, start=None, end=None):
+    """{product pk: units} from a tenant's non-canceled lines dated in [start, end)."""
+    items = OrderedItem.objects.filter(order__created_by_id=user_id).exclude(
+        order__status=Order.CANCELED
+    )
+    if start is not None:
+        items = items.filter(order__date__gte=day_start(start))
+    if end is not None:
+        items = items.filter(order__date__lt=day_start(end))
+    return dict(
+        items.values("product")
+        .annotate(units=Sum("quantity"))
+        .order_by()
+        .values_list("product", "units")
+    )
+
+
+def window_starts(user_id):
+    """({window: start}, built) of a tenant, locked and built on first use.
+
+    ``built`` is True when the rankings were just built from the tenant's
+    order lines. Must run inside a transaction.
+    """
+    starts = dict(
+        RankingWindow.objects.select_for_update()
+        .filter(created_by_id=user_id)
+        .values_list("window", "start")
+    )
+    if len(starts) < len(WINDOWS):
+        rebuild(user_id)
+        return {window: window_start(window) for window in WINDOWS}, True
+    return starts, False
+
+
+def apply(deltas):
+    """Add {(user pk, window, product pk): units}.
+
+    Each chunk of ``inventory.UPDATE_CHUNK_SIZE`` keys takes at most one
+    insert and one update.
+    """
+    deltas = {key: units for key, units in deltas.items() if units}
+    for chunk in inventory.chunks(deltas):
+        apply_chunk(chunk)
+
+
+def apply_chunk(deltas):
+    keys = Q()
+    for user_id, window, pk in deltas:
+        keys |= Q(created_by_id=user_id, window=window, product_id=pk)
+    # Rows only need creating for additions; subtractions find them in place.
+    missing = [
+        ProductRanking(created_by_id=user_id, window=window, product_id=pk)
+        for (user_id, window, pk), units in deltas.items()
+        if units > 0
+    ]
+    if missing:
+        ProductRanking.objects.bulk_create(missing, ignore_conflicts=True)
+    ProductRanking.objects.filter(keys).update(
+        units=F("units")
+        + Case(
+            *[
+                When(
+                    created_by_id=user_id,
+                    window=window,
+                    product_id=pk,
+                    then=Value(units),
+                )
+                for (user_id, window, pk), units in deltas.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    )
+
+
+def record_items(items, sign=1):
+    """Add (sign=1) or remove (sign=-1) ordered items from their tenants' rankings.
+
+    The items must be saved rows: added after they are inserted, removed
+    before they are deleted or changed. ``item.order`` must carry the status
+    and date the items were or are being saved with.
+    """
+    starts = {}
+    deltas = defaultdict(int)
+    for item in items:
+        order = item.order
+        if order.status == Order.CANCELED:
+            continue
+        if order.created_by_id not in starts:
+            tenant_starts, built = window_starts(order.created_by_id)
+            # A ranking built just now already counts the saved items.
+            starts[order.created_by_id] = None if built and sign > 0 else tenant_starts
+        if starts[order.created_by_id] is None:
+            continue
+        day = timezone.localdate(order.date)
+        for window, start in starts[order.created_by_id].items():
+            if start is None or day >= start:
+                deltas[(order.created_by_id, window, item.product_id)] += (
+                    sign * item.quantity
+                )
+    apply(deltas)
+
+
+def advance(user_id, window, today=None):
+    """Move a rolling window up to ``today``, dropping the days that left it."""
+    start = window_start(window, today)
+    row = (
+        RankingWindow.objects.filter(created_by_id=user_id, window=window)
+        .values_list("start")
+        .first()
+    )
+    if row is not None and (start is None or row[0] >= start):
+        return
+
+    with transaction.atomic():
+        current = window_starts(user_id)[0][window]
+        if start is None or current >= start:
+            return
+        apply(
+            {
+                (user_id, window, pk): -units
+                for pk, units in sold_units(user_id, current, start).items()
+            }
+        )
+        RankingWindow.objects.filter(created_by_id=user_id, window=window).update(
+            start=start, updated_at=timezone.now()
+        )
+        caching.bump_on_commit(user_id)
+
+
+def top(user_id, window, limit=DEFAULT_LIMIT, products=None):
+    """Pks of the ``limit`` best-selling products in ``window``, best first.
+
+    ``products`` optionally restricts the ranking to a product queryset.
+    When fewer products sold in the window, the list is filled up with the
+    others, by all-time units sold, so small tenants still get ``limit`` rows.
+    """
+    advance(user_id, window)
+    rows = ProductRanking.objects.filter(
+        created_by_id=user_id, window=window, units__gt=0
+    )
+    if products is None:
+        products = Product.objects.filter(created_by_id=user_id)
+    else:
+        rows = rows.filter(product__in=products)
+    # One query for both lists, each a range scan with its own limit. Twice
+    # the limit of fill rows leaves enough once the ranked ones are dropped.
+    ranked = rows.order_by("-units", "-product_id").values("product_id")[:limit]
+    fill = products.order_by("-units_sold", "-id").values("pk")[: 2 * limit]
+    window_units = ProductRanking.objects.filter(
+        created_by_id=user_id, window=window, product=OuterRef("pk")
+    ).values("units")[:1]
+    candidates = (
+        Product.objects.filter(Q(pk__in=ranked) | Q(pk__in=fill))
+        .annotate(window_units=Coalesce(Subquery(window_units), 0))
+        .values_list("pk", "window_units", "units_sold")
+    )
+    ordered = sorted(
+        candidates,
+        key=lambda row: (row[1] > 0, row[1] or row[2], row[0]),
+        reverse=True,
+    )
+    return [pk for pk, _, _ in ordered[:limit]]
+
+
+def rebuild(user=None):
+    """Recompute the rankings of one tenant (a user or pk) or of every tenant.
+
+    Returns the number of ranking rows written.
+    """
+    if user is None:
+        user_ids = {
+            *Order.objects.order_by().values_list("created_by", flat=True).distinct(),
+            *RankingWindow.objects.values_list("created_by", flat=True),
+        }
+    else:
+        user_ids = [getattr(user, "pk", user)]
+
+    count = 0
+    for user_id in user_ids:
+        ProductRanking.objects.filter(created_by_id=user_id).delete()
+        RankingWindow.objects.filter(created_by_id=user_id).delete()
+        now = timezone.now()
+        rows = []
+        for window in WINDOWS:
+            start = window_start(window)
+            RankingWindow.objects.create(
+                created_by_id=user_id, window=window, start=start, updated_at=now
+            )
+            rows.extend(
+                ProductRanking(
+                    created_by_id=user_id, window=window, product_id=pk, units=units
+                )
+                for pk, units in sold_units(user_id, start).items()
+                if units
+            )
+        ProductRanking.objects.bulk_create(rows, batch_size=1000)
+        count += len(rows)
+    return count
@@ -0,0 +1,133 @@
+from collections import defaultdict
+
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    IntegerField,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import inventory, rankings
+from .models import DailySales, OrderedItem
+
+REVENUE = Sum(
+    F("price_at_order_time") * F("quantity"),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+
+def record_order(order, sign=1):
+    """Add (sign=1) or remove (sign=-1) an order's items from the daily rollup."""
+    record_orders([order], sign)
+
+
+def record_orders(orders, sign=1):
+    record_items([item for order in orders for item in order.items.all()], sign)
+
+
+def record_items(items, sign=1):
+    """Apply ordered items to the rollup with one insert and one update per chunk.
+
+    The product rankings are kept in step with the same items.
+    """
+    items = list(items)
+    rankings.record_items(items, sign)
+    totals = defaultdict(lambda: [0, 0, 0])
+    counted = set()
+    for item in items:
+        order = item.order
+        key = (order.created_by_id, timezone.localdate(order.date), item.product_id)
+        totals[key][0] += item.quantity
+        totals[key][1] += item.price_at_order_time * item.quantity
+        if (order.pk, key) not in counted:
+            totals[key][2] += 1
+            counted.add((order.pk, key))
+    if not totals:
+        return
+
+    for chunk in inventory.chunks(totals):
+        update(chunk, sign)
+
+
+def update(totals, sign):
+    def case(index, output_field):
+        return Case(
+            *[
+                When(
+                    created_by_id=user_id,
+                    day=day,
+                    product_id=pk,
+                    then=Value(sign * values[index]),
+                )
+                for (user_id, day, pk), values in totals.items()
+            ],
+            default=Value(0),
+            output_field=output_field,
+        )
+
+    keys = Q()
+    for user_id, day, pk in totals:
+        keys |= Q(created_by_id=user_id, day=day, product_id=pk)
+    rows = DailySales.objects.filter(keys)
+    DailySales.objects.bulk_create(
+        [
+            DailySales(created_by_id=user_id, day=day, product_id=pk)
+            for user_id, day, pk in totals
+        ],
+        ignore_conflicts=True,
+    )
+    rows.update(
+        units=F("units") + case(0, IntegerField()),
+        revenue=F("revenue") + case(1, DecimalField(max_digits=14, decimal_places=2)),
+        order_count=F("order_count") + case(2, IntegerField()),
+    )
+    if sign < 0:
+        rows.filter(order_count=0).delete()
+
+
+def rebuild(user=None, batch_size=1000):
+    """Recompute the rollup from OrderedItem in one grouped query."""
+    items = OrderedItem.objects.all()
+    rows = DailySales.objects.all()
+    if user is not None:
+        items = items.filter(order__created_by=user)
+        rows = rows.filter(created_by=user)
+
+    grouped = (
+        items.annotate(day=TruncDate("order__date"))
+        .values("order__created_by", "day", "product")
+        .annotate(
+            units=Sum("quantity"),
+            revenue=REVENUE,
+            order_count=Count("order", distinct=True),
+        )
+        .order_by()
+    )
+
+    rows.delete()
+    count = 0
+    batch = []
+    for row in grouped.iterator(chunk_size=batch_size):
+        batch.append(
+            DailySales(
+                created_by_id=row["order__created_by"],
+                day=row["day"],
+                product_id=row["product"],
+                units=row["units"],
+                revenue=row["revenue"],
+                order_count=row["order_count"],
+            )
+        )
+        if len(batch) >= batch_size:
+            DailySales.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    DailySales.objects.bulk_create(batch)
+    return count + len(batch)
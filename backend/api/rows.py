@@ -0,0 +1,195 @@
+"""Read-only serialization straight from ``.values()`` rows.
+
+A ``Plan`` is compiled from a DRF serializer instance, after
+``DynamicFieldsMixin`` has applied ``?fields=``/``?exclude=``/``?expand=``,
+and renders the same output without building model instances or running
+DRF's per-field attribute lookup. Nested serializers become joined
+columns (forward relations) or one extra query per level (reverse
+relations). Serializers using anything else, such as method fields, have
+no plan and are rendered by DRF as usual.
+"""
+
+import threading
+from collections import defaultdict
+
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .serializers import requested_expansions
+
+# Fields whose to_representation() returns database values unchanged.
+PASSTHROUGH = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+class Unsupported(Exception):
+    pass
+
+
+def column_converter(field):
+    """``to_representation`` for a whole column, None passing through."""
+    if isinstance(field, serializers.DateTimeField) and (
+        getattr(field, "format", api_settings.DATETIME_FORMAT) == ISO_8601
+    ):
+        return iso_datetimes(field)
+    convert = field.to_representation
+    return lambda values: [
+        None if value is None else convert(value) for value in values
+    ]
+
+
+def iso_datetimes(field):
+    """``DateTimeField.to_representation`` with the timezone looked up once."""
+
+    def convert(values):
+        field_timezone = (
+            field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        )
+        output = []
+        for value in values:
+            if value is None:
+                output.append(None)
+                continue
+            if field_timezone is not None and timezone.is_aware(value):
+                value = value.astimezone(field_timezone)
+            else:
+                value = field.enforce_timezone(value)
+            value = value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            output.append(value)
+        return output
+
+    return convert
+
+
+class Plan:
+    def __init__(self, serializer, model):
+        self.model = model
+        self.pk = model._meta.pk.attname
+        # (kind, output name, path or relation, column converter or sub-plan)
+        self.layout = []
+        for field in serializer._readable_fields:
+            self.layout.append(self.compile(field, model))
+
+    def compile(self, field, model):
+        if field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+            raise Unsupported(field.field_name)
+        path = "__".join(field.source_attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            relation = model._meta.get_field(path)
+            if not relation.one_to_many:
+                raise Unsupported(field.field_name)
+            child = Plan(field.child, relation.related_model)
+            return ("many", field.field_name, relation.field, child)
+
+        if isinstance(field, serializers.BaseSerializer):
+            related_model = model._meta.get_field(path).related_model
+            return ("one", field.field_name, path, Plan(field, related_model))
+
+        if isinstance(field, serializers.RelatedField):
+            raise Unsupported(field.field_name)
+        if isinstance(field, PASSTHROUGH) and not isinstance(
+            field, serializers.ChoiceField
+        ):
+            return ("value", field.field_name, path, None)
+        return ("value", field.field_name, path, column_converter(field))
+
+    def paths(self, prefix=""):
+        paths = [prefix + self.pk]
+        for kind, _, path, plan in self.layout:
+            if kind == "value":
+                paths.append(prefix + path)
+            elif kind == "one":
+                paths.extend(plan.paths(f"{prefix}{path}__"))
+        return paths
+
+    def values(self, queryset):
+        """``queryset`` as the dict rows ``render()`` takes.
+
+        The ordering columns are selected too, rendered or not: a cursor
+        paginator reads its position from them.
+        """
+        ordering = [
+            field.lstrip("-")
+            for field in queryset.query.order_by
+            if isinstance(field, str)
+        ]
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values(*dict.fromkeys([*self.paths(), *ordering]))
+        )
+
+    def render(self, rows, prefix=""):
+        """Output dicts for ``rows``, in order; None where a join found no row."""
+        pk_path = prefix + self.pk
+        keys = [row[pk_path] for row in rows if row[pk_path] is not None]
+        columns = []
+        for kind, name, path, plan in self.layout:
+            if kind == "value":
+                path = prefix + path
+                values = [row[path] for row in rows]
+                columns.append((name, values if plan is None else plan(values)))
+            elif kind == "one":
+                columns.append((name, plan.render(rows, f"{prefix}{path}__")))
+            else:
+                children = plan.children(path, keys)
+                columns.append((name, [children.get(row[pk_path], []) for row in rows]))
+
+        if not columns:
+            return [None if row[pk_path] is None else {} for row in rows]
+        names = [name for name, _ in columns]
+        return [
+            None if row[pk_path] is None else dict(zip(names, values))
+            for row, values in zip(rows, zip(*[values for _, values in columns]))
+        ]
+
+    def children(self, foreign_key, keys):
+        """{parent pk: [rendered child, ...]} for a reverse relation."""
+        if not keys:
+            return {}
+        parent = foreign_key.attname
+        children = self.model._default_manager.filter(
+            **{f"{foreign_key.name}__in": keys}
+        )
+        rows = list(children.values(*dict.fromkeys([parent, *self.paths()])))
+        grouped = defaultdict(list)
+        for row, data in zip(rows, self.render(rows)):
+            grouped[row[parent]].append(data)
+        return grouped
+
+
+def plan_for(serializer_class, request):
+    """The compiled plan for this request's field selection, or None."""
+    # Keyed by recognized names only, so arbitrary query strings cannot grow
+    # the cache.
+    expansions = (
+        requested_expansions(request) & serializer_class.expandable_fields.keys()
+    )
+    key = (
+        serializer_class,
+        tuple(serializer_class.selected_fields(request)),
+        tuple(sorted(expansions)),
+    )
+    try:
+        return _plans[key]
+    except KeyError:
+        pass
+    serializer = serializer_class(context={"request": request})
+    try:
+        plan = Plan(serializer, serializer_class.Meta.model)
+    except Unsupported:
+        plan = None
+    with _plans_lock:
+        _plans[key] = plan
+    return plan
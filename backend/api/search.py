@@ -0,0 +1,86 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Customer, Product
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# model -> (FTS5 table, model fields mirrored into it)
+SEARCH_INDEXES = {
+    Product: ("api_product_fts", ["name", "SKU"]),
+    Customer: ("api_customer_fts", ["name", "email", "phone"]),
+}
+
+
+def search(queryset, q, user, limit=DEFAULT_LIMIT):
+    """Return up to ``limit`` of ``user``'s rows matching ``q``, best first.
+
+    On SQLite this reads the trigram FTS5 index maintained by triggers (see
+    migration 0003): rows containing every search term rank first, then rows
+    sharing the most trigrams with the terms, which tolerates typos. The
+    queryset's filters apply before the limit. Terms
+    shorter than three characters, and other backends, fall back to
+    ``icontains`` filters.
+    """
+    terms = q.split()
+    if not terms:
+        return []
+
+    if connection.vendor != "sqlite" or any(len(term) < 3 for term in terms):
+        return list(_filter_fallback(queryset, terms)[:limit])
+
+    table, _ = SEARCH_INDEXES[queryset.model]
+    exact = " AND ".join(_quote(term) for term in terms)
+    results = _match(queryset, table, exact, user.pk, limit)
+    if len(results) < limit:
+        fuzzy = " OR ".join(
+            _quote(term[i : i + 3]) for term in terms for i in range(len(term) - 2)
+        )
+        results += _match(
+            queryset.exclude(pk__in=[row.pk for row in results]),
+            table,
+            fuzzy,
+            user.pk,
+            limit - len(results),
+        )
+    return results
+
+
+def _match(queryset, table, expression, owner_id, limit):
+    """The best ``limit`` rows of ``queryset`` matching ``expression``.
+
+    The queryset's own filters apply before the limit; FTS5 ranks only the
+    rows that pass them.
+    """
+    column = f"{connection.ops.quote_name(queryset.model._meta.db_table)}.rowid"
+    matches = RawSQL(
+        f"SELECT rowid FROM {table} WHERE {table} MATCH %s AND created_by_id = %s",
+        [expression, owner_id],
+    )
+    rank = RawSQL(
+        f"SELECT rank FROM {table} WHERE {table} MATCH %s AND rowid = {column}",
+        [expression],
+    )
+    return list(queryset.filter(pk__in=matches).order_by(rank.asc(), "pk")[:limit])
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _filter_fallback(queryset, terms):
+    _, fields = SEARCH_INDEXES[queryset.model]
+    return queryset.filter(
+        reduce(
+            and_,
+            [
+                reduce(or_, [Q(**{f"{field}__icontains": term}) for field in fields])
+                for term in terms
+            ],
+        )
+    )
@@ -1,6 +1,20 @@
-from rest_framework import serializers
-from .models import User, Product, Customer, Order, OrderedItem
+from collections import defaultdict
+
+from rest_framework import permissions, serializers
+from .models import (
+    User,
+    Product,
+    Customer,
+    Order,
+    OrderedItem,
+    StockAlert,
+    StockMovement,
+)
+from django.core.exceptions import FieldDoesNotExist
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from . import alerts, inventory, rollups, signals, totals
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -28,7 +42,109 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def order_items():
+    return OrderedItem.objects.select_related("product__created_by")
+
+
+def query_list(request, name):
+    value = request.query_params.get(name, "")
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def requested_expansions(request):
+    if request is None:
+        return set()
+    return set(query_list(request, "expand"))
+
+
+class DynamicFieldsMixin:
+    """Read-side ``?fields=``, ``?exclude=`` and ``?expand=`` support.
+
+    Only applies to the top-level serializer of a safe request. Subclasses
+    may declare ``expandable_fields`` (``?expand=`` name -> field it replaces
+    and a factory for the expanded serializer) and the joins each field needs
+    in ``select_related_fields``/``prefetch_related_fields``, which
+    ``shape_queryset`` applies only for fields that will be rendered.
+    """
+
+    expandable_fields = {}
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+
+        selected = self.selected_fields(request)
+        for name in [name for name in self.fields if name not in selected]:
+            self.fields.pop(name)
+
+        expansions = requested_expansions(request)
+        for name, (field_name, factory) in self.expandable_fields.items():
+            if name in expansions and field_name in self.fields:
+                self.fields[field_name] = factory()
+
+    @classmethod
+    def selected_fields(cls, request):
+        names = list(cls.Meta.fields)
+        only = query_list(request, "fields")
+        if only:
+            names = [name for name in names if name in only]
+        exclude = query_list(request, "exclude")
+        return [name for name in names if name not in exclude]
+
+    @classmethod
+    def shape_queryset(cls, queryset, request):
+        """Load only the columns and relations the selected fields render."""
+        model = queryset.model
+        columns = {"pk"}
+        narrowed = set()
+        for name in cls.selected_fields(request):
+            field = cls._declared_fields.get(name)
+            source = (field.source if field is not None else None) or name
+            if "." in source:
+                path = source.replace(".", "__")
+                join = path.rsplit("__", 1)[0]
+                queryset = queryset.select_related(join)
+                columns.update([join, path])
+                narrowed.add(join)
+            else:
+                try:
+                    if model._meta.get_field(source).concrete:
+                        columns.add(source)
+                except FieldDoesNotExist:
+                    pass
+
+            if name in cls.select_related_fields:
+                queryset = queryset.select_related(*cls.select_related_fields[name])
+            if name in cls.prefetch_related_fields:
+                queryset = queryset.prefetch_related(
+                    *cls.prefetch_related_fields[name]()
+                )
+
+        # Other joined relations are rendered by nested serializers and must
+        # be loaded in full.
+        joins = [(model, "", queryset.query.select_related)]
+        while joins:
+            parent, prefix, related = joins.pop()
+            if not isinstance(related, dict):
+                continue
+            for name, nested in related.items():
+                path = prefix + name
+                related_model = parent._meta.get_field(name).related_model
+                columns.add(path)
+                if path not in narrowed:
+                    columns.update(
+                        f"{path}__{field.name}"
+                        for field in related_model._meta.concrete_fields
+                    )
+                joins.append((related_model, f"{path}__", nested))
+        return queryset.only(*columns)
+
+
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     created_by = serializers.ReadOnlyField(source="created_by.email")
 
     class Meta:
@@ -41,17 +157,56 @@ class ProductSerializer(serializers.ModelSerializer):
             "stock",
             "status",
             "units_sold",
+            "reorder_threshold",
             "created_by",
             "created_at",
             "updated_at",
         ]
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            product = super().create(validated_data)
+            inventory.record_movements(
+                {product.pk: -product.stock},
+                product.created_by_id,
+                StockMovement.ADJUSTMENT,
+            )
+        return product
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            if "stock" in validated_data:
+                instance.stock = (
+                    Product.objects.select_for_update()
+                    .values_list("stock", flat=True)
+                    .get(pk=instance.pk)
+                )
+                inventory.record_movements(
+                    {instance.pk: instance.stock - validated_data["stock"]},
+                    instance.created_by_id,
+                    StockMovement.ADJUSTMENT,
+                )
+            before = (instance.stock, instance.reorder_threshold)
+            after = (
+                validated_data.get("stock", instance.stock),
+                validated_data.get("reorder_threshold", instance.reorder_threshold),
+            )
+            alert = alerts.change(instance, *after)
+            product = super().update(instance, validated_data)
+            alerts.record([alert])
+            if after != before:
+                signals.stock_changed.send(
+                    sender=Product,
+                    tenant_id=product.created_by_id,
+                    changes=[(product.pk, before, after)],
+                )
+            return product
+
 
 class OrderedItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(), source="product", write_only=True
-    )
+    # Resolved for the whole order in one query by inventory.lock_products().
+    product_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = OrderedItem
@@ -71,13 +226,25 @@ class CustomerOrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ["id", "order_id", "date", "status", "total_items", "items"]
+        fields = [
+            "id",
+            "order_id",
+            "date",
+            "status",
+            "total_items",
+            "total_amount",
+            "items",
+        ]
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     orders = CustomerOrderSerializer(many=True, read_only=True)
     created_by = serializers.ReadOnlyField(source="created_by.email")
 
+    prefetch_related_fields = {
+        "orders": lambda: [Prefetch("orders__items", queryset=order_items())]
+    }
+
     class Meta:
         model = Customer
         fields = [
@@ -86,21 +253,85 @@ class CustomerSerializer(serializers.ModelSerializer):
             "email",
             "phone",
             "address",
+            "order_count",
+            "lifetime_value",
+            "last_order_at",
             "orders",
             "created_by",
             "created_at",
             "updated_at",
         ]
+        read_only_fields = totals.STATS_FIELDS
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderCustomerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ["id", "name", "email", "phone", "address"]
+
+
+def prefetch_order_items(order):
+    """(Re)load an order's items with their products for serialization."""
+    getattr(order, "_prefetched_objects_cache", {}).pop("items", None)
+    prefetch_related_objects([order], Prefetch("items", queryset=order_items()))
+
+
+def sync_order_items(order, quantities, products):
+    """Bring an order's lines in line with {product_id: quantity}.
+
+    Lines whose quantity is unchanged are left alone and changed lines are
+    updated in place, both keeping their ``price_at_order_time``; only new
+    products get a line at the current price. Uses the prefetched items.
+    """
+    lines = defaultdict(list)
+    for item in order.items.all():
+        lines[item.product_id].append(item)
+
+    stale, changed, added = [], [], []
+    for pk, quantity in quantities.items():
+        existing = lines.pop(pk, None)
+        if not existing:
+            added.append(
+                OrderedItem(
+                    order=order,
+                    product=products[pk],
+                    quantity=quantity,
+                    price_at_order_time=products[pk].price,
+                )
+            )
+            continue
+        line, *duplicates = existing
+        stale.extend(duplicates)
+        if line.quantity != quantity:
+            line.quantity = quantity
+            changed.append(line)
+    for removed in lines.values():
+        stale.extend(removed)
+
+    if stale:
+        OrderedItem.objects.filter(pk__in=[item.pk for item in stale]).delete()
+    if changed:
+        OrderedItem.objects.bulk_update(changed, ["quantity"])
+    if added:
+        OrderedItem.objects.bulk_create(added)
+
+
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = OrderedItemSerializer(many=True)
-    customer = CustomerSerializer(read_only=True)
+    customer = OrderCustomerSerializer(read_only=True)
     customer_id = serializers.PrimaryKeyRelatedField(
         queryset=Customer.objects.all(), source="customer", write_only=True
     )
     created_by = serializers.ReadOnlyField(source="created_by.email")
 
+    expandable_fields = {
+        "customer.orders": ("customer", lambda: CustomerSerializer(read_only=True))
+    }
+    select_related_fields = {"customer": ["customer"]}
+    prefetch_related_fields = {
+        "items": lambda: [Prefetch("items", queryset=order_items())]
+    }
+
     class Meta:
         model = Order
         fields = [
@@ -111,97 +342,135 @@ class OrderSerializer(serializers.ModelSerializer):
             "customer_id",
             "status",
             "total_items",
+            "total_amount",
             "items",
             "created_by",
             "created_at",
             "updated_at",
         ]
+        read_only_fields = ["total_amount"]
 
     def create(self, validated_data):
         items_data = validated_data.pop("items")
-        validated_data["created_by"] = self.context["request"].user
-        order = Order.objects.create(**validated_data)
-
-        from collections import defaultdict
-
-        product_quantities = defaultdict(int)
-        for item in items_data:
-            product = item["product"]
-            quantity = item["quantity"]
-            print(f"[DEBUG] Adding {quantity} of {product.name} to order")
-            product_quantities[product] += quantity
-
-        total_items = 0
-        for product, quantity in product_quantities.items():
-            print(f"[DEBUG] Processing product: {product.name}")
-            print(f"[DEBUG] Available stock: {product.stock}")
-            print(f"[DEBUG] Requested quantity: {quantity}")
-            if product.stock < quantity:
-                raise serializers.ValidationError(
-                    f"Not enough stock for product {product.name}. Available: {product.stock}, required: {quantity}"
-                )
-            OrderedItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price_at_order_time=product.price,
+        user = self.context["request"].user
+        quantities = inventory.count_quantities(items_data)
+        canceled = validated_data.get("status") == Order.CANCELED
+        taken = {} if canceled else quantities
+
+        with transaction.atomic():
+            products = inventory.lock_products(quantities, user.pk)
+            inventory.check_stock(products, taken)
+            order = Order.objects.create(
+                created_by=user,
+                total_items=sum(quantities.values()),
+                total_amount=sum(
+                    products[pk].price * quantity for pk, quantity in quantities.items()
+                ),
+                **validated_data,
+            )
+            OrderedItem.objects.bulk_create(
+                [
+                    OrderedItem(
+                        order=order,
+                        product=products[pk],
+                        quantity=quantity,
+                        price_at_order_time=products[pk].price,
+                    )
+                    for pk, quantity in quantities.items()
+                ]
             )
-            product.stock -= quantity
-            print(f"[DEBUG] New stock for {product.name}: {product.stock}")
-            product.save()
-            total_items += quantity
-
-        print(f"[DEBUG] Total items in order: {total_items}")
-        order.total_items = total_items
-        order.save()
+            inventory.apply_stock_deltas(taken, products)
+            inventory.record_movements(taken, user.pk, StockMovement.ORDER, order)
+            prefetch_order_items(order)
+            rollups.record_order(order)
+            totals.refresh_customers([order.customer_id])
         return order
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop("items", None)
-        instance.customer = validated_data.get("customer", instance.customer)
-        instance.status = validated_data.get("status", instance.status)
-        instance.date = validated_data.get("date", instance.date)
 
-        if items_data is not None:
-            print(f"[DEBUG] Restoring stock for existing items...")
+        with transaction.atomic():
+            prefetch_order_items(instance)
+            rollups.record_order(instance, sign=-1)
+            previous_customer_id = instance.customer_id
+            instance.customer = validated_data.get("customer", instance.customer)
+            instance.date = validated_data.get("date", instance.date)
+            status = validated_data.get("status", instance.status)
+
+            current = defaultdict(int)
             for ordered_item in instance.items.all():
-                product = ordered_item.product
-                print(f"[DEBUG] Restoring {ordered_item.quantity} to {product.name}")
-                product.stock += ordered_item.quantity
-                product.save()
-
-            instance.items.all().delete()
-
-            from collections import defaultdict
-
-            product_quantities = defaultdict(int)
-            for item in items_data:
-                product = item["product"]
-                quantity = item["quantity"]
-                print(f"[DEBUG] Adding {quantity} of {product.name} to updated order")
-                product_quantities[product] += quantity
-
-            total_items = 0
-            for product, quantity in product_quantities.items():
-                print(f"[DEBUG] Updated order - checking stock for {product.name}")
-                print(f"[DEBUG] Available stock: {product.stock}")
-                print(f"[DEBUG] Requested quantity: {quantity}")
-                if product.stock < quantity:
-                    raise serializers.ValidationError(
-                        f"Not enough stock for product {product.name}. Available: {product.stock}, required: {quantity}"
-                    )
-                OrderedItem.objects.create(
-                    order=instance,
-                    product=product,
-                    quantity=quantity,
-                    price_at_order_time=product.price,
+                current[ordered_item.product_id] += ordered_item.quantity
+            if items_data is not None:
+                quantities = inventory.count_quantities(items_data)
+            else:
+                quantities = dict(current)
+
+            # Canceled orders hold no stock: canceling returns it, reopening
+            # takes it again.
+            released = {} if instance.status == Order.CANCELED else current
+            taken = {} if status == Order.CANCELED else quantities
+            deltas = {
+                pk: taken.get(pk, 0) - released.get(pk, 0)
+                for pk in taken.keys() | released.keys()
+            }
+
+            products = None
+            if items_data is not None or any(deltas.values()):
+                products = inventory.lock_products(
+                    quantities.keys() | released.keys(), instance.created_by_id
                 )
-                product.stock -= quantity
-                print(f"[DEBUG] New stock for {product.name}: {product.stock}")
-                product.save()
-                total_items += quantity
+                inventory.check_stock(products, taken, released)
+
+            if items_data is not None:
+                sync_order_items(instance, quantities, products)
+                instance.total_items = sum(quantities.values())
+
+            inventory.apply_stock_deltas(deltas, products)
+            if status == Order.CANCELED and instance.status != Order.CANCELED:
+                reason = StockMovement.CANCELLATION
+            elif instance.status == Order.CANCELED and status != Order.CANCELED:
+                reason = StockMovement.ORDER
+            else:
+                reason = StockMovement.EDIT
+            inventory.record_movements(deltas, instance.created_by_id, reason, instance)
+            instance.status = status
+
+            prefetch_order_items(instance)
+            instance.total_amount = totals.order_total(instance.items.all())
+            instance.save()
+            rollups.record_order(instance)
+            totals.refresh_customers([previous_customer_id, instance.customer_id])
+        return instance
 
-            instance.total_items = total_items
 
-        instance.save()
-        return instance
+class BulkOrderItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class BulkOrderSerializer(serializers.Serializer):
+    """Shape-only validation for one entry of a bulk import.
+
+    References are resolved for the whole batch by ``bulk.create_orders``.
+    """
+
+    customer_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, default="pending")
+    date = serializers.DateTimeField(required=False)
+    items = BulkOrderItemSerializer(many=True, allow_empty=False)
+
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    product_name = serializers.ReadOnlyField(source="product.name")
+
+    class Meta:
+        model = StockAlert
+        fields = [
+            "id",
+            "product",
+            "product_name",
+            "level",
+            "stock",
+            "threshold",
+            "created_at",
+        ]
@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import alerts, authentication, events
+from .caching import bump_on_commit
+from .models import Customer, Order, Product, User
+
+# Sent with ``tenant_id`` and ``changes``, a list of (product pk, (stock,
+# threshold) before, (stock, threshold) after), by the writes that change
+# stock with a queryset update instead of saving the product.
+stock_changed = Signal()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    bump_on_commit(instance.created_by_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_state(sender, instance, **kwargs):
+    authentication.forget(instance.pk)
+
+
+@receiver(post_save, sender=Order)
+def publish_order_saved(sender, instance, created, **kwargs):
+    after = instance.summary_state()
+    before = None if created else getattr(instance, "_summary_state", None)
+    metrics = {}
+    if after is not None and (created or before is not None):
+        metrics = events.order_metrics([(before, after)])
+    instance._summary_state = after
+    events.send(
+        instance.created_by_id,
+        [
+            (
+                "order.created" if created else "order.updated",
+                events.order_data(instance),
+            ),
+            ("metrics.delta", metrics),
+        ],
+    )
+
+
+@receiver(post_delete, sender=Order)
+def publish_order_deleted(sender, instance, **kwargs):
+    before = getattr(instance, "_summary_state", None) or instance.summary_state()
+    events.send(
+        instance.created_by_id,
+        [
+            ("order.deleted", {"id": instance.pk}),
+            ("metrics.delta", events.order_metrics([(before, None)]) if before else {}),
+        ],
+    )
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def publish_customer_count(sender, instance, created=None, **kwargs):
+    if created is None:
+        events.send(
+            instance.created_by_id, [("metrics.delta", {"total_customers": -1})]
+        )
+    elif created:
+        events.send(instance.created_by_id, [("metrics.delta", {"total_customers": 1})])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def publish_product_count(sender, instance, created=None, **kwargs):
+    level = alerts.level(instance.stock, instance.reorder_threshold)
+    if created is None:
+        levels = [(level, None)]
+    elif created:
+        levels = [(None, level)]
+    else:
+        return
+    events.send(
+        instance.created_by_id, [("metrics.delta", events.product_metrics(levels))]
+    )
+
+
+@receiver(stock_changed)
+def publish_stock_changed(sender, tenant_id, changes, **kwargs):
+    events.send(tenant_id, events.stock_events(changes))
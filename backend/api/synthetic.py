@@ -0,0 +1,317 @@
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import inventory, rankings
+from .models import Customer, DailySales, Order, OrderedItem, Product, User
+
+# Share of orders per status, lines per order and units per line, roughly
+# following what a small shop sees.
+STATUS_WEIGHTS = {
+    "delivered": 55,
+    "shipped": 12,
+    "processing": 10,
+    "pending": 18,
+    "canceled": 5,
+}
+LINE_WEIGHTS = {1: 40, 2: 25, 3: 15, 4: 8, 5: 5, 6: 3, 8: 2, 10: 1, 20: 1}
+QUANTITY_WEIGHTS = {1: 60, 2: 20, 3: 10, 5: 6, 10: 3, 25: 1}
+# Product popularity follows a Zipf-like curve: a few products take most sales.
+POPULARITY_EXPONENT = 1.1
+
+PRODUCT_FIELDS = [
+    "id",
+    "name",
+    "SKU",
+    "price",
+    "stock",
+    "status",
+    "units_sold",
+    "reorder_threshold",
+    "created_at",
+    "updated_at",
+    "created_by",
+]
+CUSTOMER_FIELDS = [
+    "id",
+    "name",
+    "email",
+    "phone",
+    "address",
+    "order_count",
+    "lifetime_value",
+    "created_at",
+    "updated_at",
+    "created_by",
+]
+ORDER_FIELDS = [
+    "id",
+    "order_id",
+    "date",
+    "customer",
+    "status",
+    "total_items",
+    "total_amount",
+    "created_at",
+    "updated_at",
+    "created_by",
+]
+ITEM_FIELDS = ["id", "order", "product", "quantity", "price_at_order_time"]
+DAILY_SALES_FIELDS = ["created_by", "day", "product", "units", "revenue", "order_count"]
+
+
+def weighted(rng, weights, k=1):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def insert_rows(model, fields, rows):
+    """INSERT pre-adapted rows with executemany, skipping model instances.
+
+    Building model objects costs far more than the inserts themselves, so
+    rows are written as tuples with primary keys assigned up front.
+    """
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+            f"VALUES ({placeholders})",
+            rows,
+        )
+
+
+def generate(
+    users,
+    products,
+    customers,
+    orders,
+    days=365,
+    seed=0,
+    batch_size=5000,
+    password="password",
+    log=None,
+):
+    """Bulk-insert ``users`` tenants, each with the given number of rows.
+
+    Returns the number of rows written per model. Emails and SKUs are derived
+    from ``seed``, so rerunning with the same seed collides on purpose.
+    """
+    rng = random.Random(seed)
+    emails = [f"load-{seed}-{i}@example.com" for i in range(users)]
+    taken = list(User.objects.filter(email__in=emails).values_list("email", flat=True))
+    if taken:
+        raise ValueError(f"{taken[0]} already exists; use another seed.")
+
+    hashed = make_password(password)
+    counts = dict.fromkeys(["users", "products", "customers", "orders", "items"], 0)
+    for number, email in enumerate(emails):
+        with transaction.atomic():
+            user = User.objects.create(
+                email=email,
+                name=f"Load {number}",
+                phone_number=str(number),
+                password=hashed,
+            )
+            written = generate_tenant(
+                rng, user, products, customers, orders, days, batch_size
+            )
+        counts["users"] += 1
+        for model, count in written.items():
+            counts[model] += count
+        if log:
+            log(f"{email}: {written}")
+    return counts
+
+
+def generate_tenant(rng, user, products, customers, orders, days, batch_size):
+    # Resolved once: the connection proxy and timezone lookups are
+    # noticeable when repeated per row.
+    db = transaction.get_connection()
+    adapt_datetime = db.ops.adapt_datetimefield_value
+    adapt_decimal = db.ops.adapt_decimalfield_value
+    order_id_field = Order._meta.get_field("order_id")
+    local_tz = timezone.get_current_timezone()
+    now = timezone.now()
+    stamp = adapt_datetime(now)
+
+    reorder_threshold = Product._meta.get_field("reorder_threshold").default
+    first_product = next_id(Product)
+    product_pks = list(range(first_product, first_product + products))
+    prices = [Decimal(rng.randint(100, 50000)) / 100 for _ in range(products)]
+    stored_prices = [adapt_decimal(price) for price in prices]
+    insert_rows(
+        Product,
+        PRODUCT_FIELDS,
+        [
+            (
+                pk,
+                f"Product {i}",
+                f"{user.pk}-{i:07d}",
+                stored_prices[i],
+                rng.randint(0, 1000),
+                "active" if rng.random() < 0.9 else "inactive",
+                0,
+                reorder_threshold,
+                stamp,
+                stamp,
+                user.pk,
+            )
+            for i, pk in enumerate(product_pks)
+        ],
+    )
+
+    first_customer = next_id(Customer)
+    customer_pks = list(range(first_customer, first_customer + customers))
+    insert_rows(
+        Customer,
+        CUSTOMER_FIELDS,
+        [
+            (
+                pk,
+                f"Customer {i}",
+                f"customer{i}@example.com",
+                f"555{i:07d}",
+                f"{i} Main Street",
+                0,
+                adapt_decimal(Decimal(0)),
+                stamp,
+                stamp,
+                user.pk,
+            )
+            for i, pk in enumerate(customer_pks)
+        ],
+    )
+
+    ranking = list(range(products))
+    rng.shuffle(ranking)
+    popularity = list(
+        accumulate(1 / (rank + 1) ** POPULARITY_EXPONENT for rank in ranking)
+    )
+    units_sold = [0] * products
+    # Per customer pk: [order count, lifetime value, last order date].
+    customer_stats = {}
+    # The daily rollup is accumulated here; rollups.rebuild() would re-read
+    # every line through a per-row date conversion.
+    daily = {}
+    window = days * 86400
+    order_pk = next_id(Order)
+    item_pk = next_id(OrderedItem)
+    items = 0
+
+    for start in range(0, orders, batch_size):
+        size = min(batch_size, orders - start)
+        order_rows = []
+        item_rows = []
+        for status, count in zip(
+            weighted(rng, STATUS_WEIGHTS, size), weighted(rng, LINE_WEIGHTS, size)
+        ):
+            date = now - timedelta(seconds=rng.random() * window)
+            day = date.astimezone(local_tz).date()
+            chosen = set(rng.choices(range(products), cum_weights=popularity, k=count))
+            quantities = weighted(rng, QUANTITY_WEIGHTS, len(chosen))
+            customer_pk = rng.choice(customer_pks)
+            total_amount = Decimal(0)
+            for index, quantity in zip(chosen, quantities):
+                item_rows.append(
+                    (
+                        item_pk,
+                        order_pk,
+                        product_pks[index],
+                        quantity,
+                        stored_prices[index],
+                    )
+                )
+                item_pk += 1
+                if status != Order.CANCELED:
+                    units_sold[index] += quantity
+                totals = daily.setdefault((day, index), [0, 0, 0])
+                totals[0] += quantity
+                totals[1] += prices[index] * quantity
+                totals[2] += 1
+                total_amount += prices[index] * quantity
+            if status != Order.CANCELED:
+                stats = customer_stats.setdefault(customer_pk, [0, Decimal(0), date])
+                stats[0] += 1
+                stats[1] += total_amount
+                stats[2] = max(stats[2], date)
+            order_rows.append(
+                (
+                    order_pk,
+                    order_id_field.get_db_prep_value(
+                        uuid.UUID(int=rng.getrandbits(128), version=4), db
+                    ),
+                    adapt_datetime(date),
+                    customer_pk,
+                    status,
+                    sum(quantities),
+                    adapt_decimal(total_amount),
+                    stamp,
+                    stamp,
+                    user.pk,
+                )
+            )
+            order_pk += 1
+        insert_rows(Order, ORDER_FIELDS, order_rows)
+        insert_rows(OrderedItem, ITEM_FIELDS, item_rows)
+        items += len(item_rows)
+
+    with db.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {db.ops.quote_name(Product._meta.db_table)} "
+            "SET units_sold = %s WHERE id = %s",
+            [
+                (units, product_pks[index])
+                for index, units in enumerate(units_sold)
+                if units
+            ],
+        )
+        cursor.executemany(
+            f"UPDATE {db.ops.quote_name(Customer._meta.db_table)} "
+            "SET order_count = %s, lifetime_value = %s, last_order_at = %s "
+            "WHERE id = %s",
+            [
+                (count, adapt_decimal(value), adapt_datetime(last), pk)
+                for pk, (count, value, last) in customer_stats.items()
+            ],
+        )
+        for sql in db.ops.sequence_reset_sql(
+            no_style(), [Product, Customer, Order, OrderedItem]
+        ):
+            cursor.execute(sql)
+
+    insert_rows(
+        DailySales,
+        DAILY_SALES_FIELDS,
+        [
+            (
+                user.pk,
+                db.ops.adapt_datefield_value(day),
+                product_pks[index],
+                units,
+                adapt_decimal(revenue),
+                count,
+            )
+            for (day, index), (units, revenue, count) in daily.items()
+        ],
+    )
+    inventory.take_snapshots(user=user, batch_size=batch_size)
+    rankings.rebuild(user)
+    return {
+        "products": products,
+        "customers": customers,
+        "orders": orders,
+        "items": items,
+    }
@@ -1,3 +1,2183 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import json
+import os
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from unittest import mock, skipUnless
+
+from . import (
+    async_views,
+    authentication,
+    benchmark,
+    events,
+    inventory,
+    profiling,
+    rankings,
+    renderers,
+    rollups,
+    rows,
+    totals,
+    urls,
+)
+from .models import (
+    User,
+    Product,
+    Customer,
+    Order,
+    OrderedItem,
+    DailySales,
+    ProductRanking,
+    RankingWindow,
+    StockAlert,
+    StockMovement,
+    StockSnapshot,
+)
+from .views import BULK_ORDER_LIMIT, STREAM_CHUNK_SIZE
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite's")
+class ListQueryIndexTests(TestCase):
+    """Every list query filtered by tenant must be answered from an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        customer = Customer.objects.create(
+            name="C", email="c@example.com", phone="1", address="x", created_by=cls.user
+        )
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"P{i}",
+                SKU=f"SKU-{i}",
+                price="1.00",
+                stock=i % 15,
+                units_sold=i,
+                created_by=cls.user,
+            )
+            for i in range(50)
+        )
+        orders = Order.objects.bulk_create(
+            Order(customer=customer, status="pending", created_by=cls.user)
+            for _ in range(20)
+        )
+        OrderedItem.objects.bulk_create(
+            OrderedItem(
+                order=order, product=products[i], quantity=1, price_at_order_time="1.00"
+            )
+            for i, order in enumerate(orders)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        for query in queries.captured_queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append([row[-1] for row in cursor.fetchall()])
+        return plans
+
+    def assert_indexed(self, url, tables, index=None):
+        plans = self.query_plans(url)
+        for plan in plans:
+            for step in plan:
+                if step.split()[:2] in [["SCAN", table] for table in tables]:
+                    self.assertIn("INDEX", step, f"{url}: full scan in {plan}")
+        if index:
+            self.assertTrue(
+                any(index in step for plan in plans for step in plan),
+                f"{url}: {index} not used by {plans}",
+            )
+
+    def test_product_lists(self):
+        for url, index in [
+            ("/api/products/", None),
+            ("/api/products/?all=true", None),
+            ("/api/products/?cursor=", None),
+            ("/api/products/?top=true", "product_ranking_units_idx"),
+            ("/api/products/?top=true&window=30d", "product_ranking_units_idx"),
+            ("/api/products/?status=active", "product_owner_status_idx"),
+            ("/api/products/?status=inactive", "product_owner_status_idx"),
+            ("/api/products/?status=low stock", "product_owner_below_idx"),
+            ("/api/products/?status=below threshold", "product_owner_below_idx"),
+            ("/api/products/?status=out of stock", "product_owner_stock_idx"),
+        ]:
+            self.assert_indexed(url, ["api_product"], index)
+
+    def test_customer_lists(self):
+        for url, index in [
+            ("/api/customers/", None),
+            ("/api/customers/?all=true", None),
+            ("/api/customers/?ordering=-lifetime_value", "customer_owner_value_idx"),
+            ("/api/customers/?ordering=order_count", "customer_owner_count_idx"),
+            (
+                "/api/customers/?ordering=-last_order_at&cursor=",
+                "customer_owner_last_order_idx",
+            ),
+            ("/api/customers/?min_lifetime_value=10", "customer_owner_value_idx"),
+        ]:
+            self.assert_indexed(url, ["api_customer"], index)
+
+    def test_order_lists(self):
+        for url, index in [
+            ("/api/orders/", None),
+            ("/api/orders/?all=true", None),
+            ("/api/orders/?cursor=", None),
+            ("/api/orders/?status=pending", "order_owner_status_idx"),
+            ("/api/orders/recent/", "order_owner_created_idx"),
+            ("/api/dashboard/summary/", "order_owner_date_idx"),
+        ]:
+            self.assert_indexed(url, ["api_order", "api_product"], index)
+
+
+class DashboardSummaryTests(TestCase):
+    """The summary aggregates only the tenant's own rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.widget, cls.gadget, cls.gizmo = Product.objects.bulk_create(
+            Product(name=name, SKU=name, price="5.00", stock=stock, created_by=cls.user)
+            for name, stock in [("Widget", 20), ("Gadget", 3), ("Gizmo", 0)]
+        )
+        cls.customers = Customer.objects.bulk_create(
+            Customer(
+                name=f"C{i}",
+                email=f"c{i}@example.com",
+                phone="1",
+                address="x",
+                created_by=cls.user,
+            )
+            for i in range(2)
+        )
+        other = User.objects.create_user("other@example.com", "Other", "2", "pw")
+        seed_tenant(other, 3, 2, 4)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def order(self, quantity, **fields):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customers[0].pk,
+                "items": [
+                    {
+                        "product_id": self.widget.pk,
+                        "quantity": quantity,
+                        "price_at_order_time": "5.00",
+                    }
+                ],
+                **fields,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_summary(self):
+        this_month = timezone.localtime()
+        last_month = this_month.replace(day=1) - timedelta(days=1)
+        self.order(2)
+        self.order(1, status="shipped", date=last_month.isoformat())
+
+        response = self.client.get("/api/dashboard/summary/")
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data["orders_this_month"], 1)
+        self.assertEqual(data["revenue_this_month"], Decimal("10.00"))
+        self.assertEqual(
+            data["monthly_revenue"],
+            [
+                {"month": last_month.strftime("%Y-%m"), "revenue": Decimal("5.00")},
+                {"month": this_month.strftime("%Y-%m"), "revenue": Decimal("10.00")},
+            ],
+        )
+        self.assertEqual(
+            data["orders_by_status"],
+            {
+                "pending": 1,
+                "processing": 0,
+                "shipped": 1,
+                "delivered": 0,
+                "canceled": 0,
+            },
+        )
+        self.assertEqual(data["total_customers"], 2)
+        self.assertEqual(
+            data["products"],
+            {"total": 3, "active": 2, "low_stock": 1, "out_of_stock": 1},
+        )
+
+    def test_empty_tenant(self):
+        user = User.objects.create_user("new@example.com", "New", "3", "pw")
+        self.client.force_authenticate(user)
+        data = self.client.get("/api/dashboard/summary/").data
+        self.assertEqual(data["orders_this_month"], 0)
+        self.assertEqual(data["revenue_this_month"], 0)
+        self.assertEqual(data["monthly_revenue"], [])
+        self.assertEqual(set(data["orders_by_status"].values()), {0})
+        self.assertEqual(
+            data["products"],
+            {"total": 0, "active": 0, "low_stock": 0, "out_of_stock": 0},
+        )
+
+
+def seed_tenant(user, products, customers, orders, items_per_order=3):
+    """Bulk-insert a tenant with ``orders`` orders spread over its customers."""
+    product_rows = Product.objects.bulk_create(
+        Product(
+            name=f"{user.pk}-P{i}",
+            SKU=f"{user.pk}-SKU-{i}",
+            price="2.50",
+            stock=100 + i % 50,
+            created_by=user,
+        )
+        for i in range(products)
+    )
+    customer_rows = Customer.objects.bulk_create(
+        Customer(
+            name=f"Customer {i}",
+            email=f"c{i}@example.com",
+            phone=str(i),
+            address="x",
+            created_by=user,
+        )
+        for i in range(customers)
+    )
+    order_rows = Order.objects.bulk_create(
+        Order(
+            customer=customer_rows[i % customers],
+            status=Order.STATUS_CHOICES[i % 4][0],
+            total_items=items_per_order,
+            created_by=user,
+        )
+        for i in range(orders)
+    )
+    OrderedItem.objects.bulk_create(
+        OrderedItem(
+            order=order,
+            product=product_rows[(i + j) % products],
+            quantity=1,
+            price_at_order_time="2.50",
+        )
+        for i, order in enumerate(order_rows)
+        for j in range(items_per_order)
+    )
+    rollups.rebuild(user=user)
+    rankings.rebuild(user=user)
+    totals.backfill(user=user)
+    return product_rows, customer_rows, order_rows
+
+
+class EndpointQueryBudgetTests(TestCase):
+    """Every route runs in a fixed number of queries, whatever the tenant size.
+
+    Each request is measured against a small tenant and a large one; the
+    counts must match and stay within the route's budget. Wall-clock time per
+    request is recorded and written as JSON to ``$API_LATENCY_REPORT`` if set.
+    """
+
+    READ_BUDGETS = {
+        "/api/products/": 3,
+        "/api/products/?cursor=": 2,
+        "/api/products/?status=low stock": 2,
+        "/api/products/?top=true": 6,
+        "/api/products/?fields=id,name,stock": 3,
+        "/api/products/{product}/": 2,
+        "/api/products/{product}/stock/": 2,
+        "/api/customers/": 7,
+        "/api/customers/?exclude=orders": 5,
+        "/api/customers/{customer}/": 6,
+        "/api/orders/": 6,
+        "/api/orders/?cursor=": 5,
+        "/api/orders/?status=pending": 6,
+        "/api/orders/?expand=customer.orders": 9,
+        "/api/orders/recent/": 5,
+        "/api/orders/{order}/": 5,
+        "/api/dashboard/summary/": 6,
+    }
+    # Search results are capped by ?limit= rather than paginated.
+    SEARCH_BUDGETS = {
+        "/api/products/?q=-P1": 3,
+        "/api/customers/?q=Customer": 7,
+    }
+    # ?all=true streams STREAM_CHUNK_SIZE rows at a time and each chunk runs
+    # its own prefetches: (model, budget for one chunk, per extra chunk).
+    STREAM_BUDGETS = {
+        "/api/products/?all=true": (Product, 2, 0),
+        "/api/customers/?all=true": (Customer, 6, 2),
+        "/api/orders/?all=true": (Order, 5, 1),
+    }
+    latencies = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small = User.objects.create_user("small@example.com", "Small", "1", "pw")
+        cls.large = User.objects.create_user("large@example.com", "Large", "1", "pw")
+        cls.rows = {
+            cls.small: seed_tenant(cls.small, products=3, customers=2, orders=4),
+            cls.large: seed_tenant(
+                cls.large, products=2000, customers=1000, orders=2000
+            ),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        path = os.environ.get("API_LATENCY_REPORT")
+        if path:
+            with open(path, "w") as report:
+                json.dump(cls.latencies, report, indent=2, sort_keys=True)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def url_for(self, user, template):
+        products, customers, orders = self.rows[user]
+        return template.format(
+            product=products[0].pk, customer=customers[0].pk, order=orders[0].pk
+        )
+
+    def measure(self, label, client, method, url, data=None):
+        # Cached responses would hide the queries behind them.
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 300, f"{label}: {response.status_code}")
+        self.latencies[label] = round(elapsed * 1000, 2)
+        return len(queries), queries
+
+    def assert_budget(self, label, count, budget, queries):
+        self.assertLessEqual(
+            count,
+            budget,
+            f"{label}: {count} queries, budget {budget}:\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+
+    def test_reads_do_not_scale_with_rows(self):
+        for template, budget in self.READ_BUDGETS.items():
+            with self.subTest(template):
+                counts = {}
+                for user in (self.small, self.large):
+                    url = self.url_for(user, template)
+                    label = f"GET {template} ({user.name.lower()})"
+                    counts[user], queries = self.measure(
+                        label, self.client_for(user), "get", url
+                    )
+                self.assert_budget(template, counts[self.large], budget, queries)
+                self.assertEqual(counts[self.small], counts[self.large], template)
+
+    def test_search_does_not_scale_with_limit(self):
+        client = self.client_for(self.large)
+        for url, budget in self.SEARCH_BUDGETS.items():
+            with self.subTest(url):
+                counts = []
+                for limit in (1, 20):
+                    count, queries = self.measure(
+                        f"GET {url}&limit={limit}",
+                        client,
+                        "get",
+                        f"{url}&limit={limit}",
+                    )
+                    counts.append(count)
+                self.assert_budget(url, count, budget, queries)
+                self.assertEqual(counts[0], counts[1], url)
+
+    def test_streams_scale_with_chunks_only(self):
+        for url, (model, budget, per_chunk) in self.STREAM_BUDGETS.items():
+            for user in (self.small, self.large):
+                with self.subTest(url, tenant=user.name):
+                    count, queries = self.measure(
+                        f"GET {url} ({user.name.lower()})",
+                        self.client_for(user),
+                        "get",
+                        url,
+                    )
+                    rows = model.objects.filter(created_by=user).count()
+                    extra_chunks = max(0, -(-rows // STREAM_CHUNK_SIZE) - 1)
+                    self.assert_budget(
+                        url, count, budget + per_chunk * extra_chunks, queries
+                    )
+
+    AUTH_BUDGETS = {
+        "POST /api/auth/register/": 2,
+        "POST /api/auth/login/": 1,
+        "POST /api/token/": 1,
+        "POST /api/token/refresh/": 1,
+    }
+    WRITE_BUDGETS = {
+        "POST /api/orders/": 15,
+        "PUT /api/orders/{order}/": 23,
+        "POST /api/orders/bulk/": 14,
+        "POST /api/products/": 5,
+        "PUT /api/products/{product}/": 8,
+        "POST /api/customers/": 2,
+        "PUT /api/customers/{customer}/": 5,
+        "DELETE /api/orders/{order}/": 16,
+        "DELETE /api/customers/{customer}/": 6,
+        "DELETE /api/products/{product}/": 14,
+    }
+
+    def order_payload(self, lines):
+        products, customers, _ = self.rows[self.large]
+        return {
+            "customer_id": customers[0].pk,
+            "items": [
+                {
+                    "product_id": product.pk,
+                    "quantity": 1,
+                    "price_at_order_time": "2.50",
+                }
+                for product in products[:lines]
+            ],
+        }
+
+    def test_writes_do_not_scale_with_payload(self):
+        client = self.client_for(self.large)
+        payloads = {
+            "POST /api/orders/": [
+                ("1 line", self.order_payload(1)),
+                ("20 lines", self.order_payload(20)),
+            ],
+            "PUT /api/orders/{order}/": [
+                ("1 line", {"items": self.order_payload(1)["items"]}),
+                ("20 lines", {"items": self.order_payload(20)["items"]}),
+            ],
+            "POST /api/orders/bulk/": [
+                ("1 order", [self.order_payload(1)]),
+                ("20 orders", [self.order_payload(2)] * 20),
+            ],
+        }
+        for template, bodies in payloads.items():
+            with self.subTest(template):
+                method, path = template.split()
+                url = self.url_for(self.large, path)
+                counts = []
+                for size, body in bodies:
+                    count, queries = self.measure(
+                        f"{template} ({size})", client, method.lower(), url, body
+                    )
+                    counts.append(count)
+                self.assert_budget(
+                    template, count, self.WRITE_BUDGETS[template], queries
+                )
+                self.assertEqual(counts[0], counts[1], template)
+
+    def test_write_budgets(self):
+        client = self.client_for(self.large)
+        bodies = {
+            "POST /api/products/": {
+                "name": "New",
+                "SKU": "NEW-1",
+                "price": "1.00",
+                "stock": 5,
+            },
+            "PUT /api/products/{product}/": {"stock": 7},
+            "POST /api/customers/": {
+                "name": "New",
+                "email": "new@example.com",
+                "phone": "1",
+                "address": "x",
+            },
+            "PUT /api/customers/{customer}/": {"name": "Renamed"},
+            "DELETE /api/orders/{order}/": None,
+            "DELETE /api/customers/{customer}/": None,
+            "DELETE /api/products/{product}/": None,
+        }
+        for template, body in bodies.items():
+            with self.subTest(template):
+                method, path = template.split()
+                count, queries = self.measure(
+                    template,
+                    client,
+                    method.lower(),
+                    self.url_for(self.large, path),
+                    body,
+                )
+                self.assert_budget(
+                    template, count, self.WRITE_BUDGETS[template], queries
+                )
+
+    def test_auth_budgets(self):
+        client = APIClient()
+        credentials = {"email": "large@example.com", "password": "pw"}
+        requests = [
+            (
+                "POST /api/auth/register/",
+                "/api/auth/register/",
+                {
+                    "email": "new@example.com",
+                    "name": "New",
+                    "phone_number": "1",
+                    "password": "a-Strong-pass-123",
+                    "confirm_password": "a-Strong-pass-123",
+                },
+            ),
+            ("POST /api/auth/login/", "/api/auth/login/", credentials),
+            ("POST /api/token/", "/api/token/", credentials),
+        ]
+        for label, url, body in requests:
+            with self.subTest(label):
+                count, queries = self.measure(label, client, "post", url, body)
+                self.assert_budget(label, count, self.AUTH_BUDGETS[label], queries)
+
+        refresh = client.post("/api/token/", credentials, format="json").data
+        count, queries = self.measure(
+            "POST /api/token/refresh/",
+            client,
+            "post",
+            "/api/token/refresh/",
+            {"refresh": refresh["refresh"]},
+        )
+        self.assert_budget(
+            "POST /api/token/refresh/",
+            count,
+            self.AUTH_BUDGETS["POST /api/token/refresh/"],
+            queries,
+        )
+
+
+class SalesRollupTests(TestCase):
+    """The daily sales rollup matches the order lines after every write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, _ = seed_tenant(cls.user, 7, 2, 4)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def rollup(self):
+        return set(
+            DailySales.objects.filter(created_by=self.user).values_list(
+                "day", "product", "units", "revenue", "order_count"
+            )
+        )
+
+    def assert_matches_rebuild(self):
+        stored = self.rollup()
+        rollups.rebuild(self.user)
+        self.assertEqual(stored, self.rollup())
+
+    def test_order_writes(self):
+        self.assert_matches_rebuild()
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customers[0].pk,
+                "items": [
+                    {
+                        "product_id": product.pk,
+                        "quantity": 2,
+                        "price_at_order_time": "1.00",
+                    }
+                    for product in self.products[:2]
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_matches_rebuild()
+
+        url = f"/api/orders/{response.data['id']}/"
+        for body in [
+            {"items": [{"product_id": self.products[2].pk, "quantity": 1}]},
+            {"date": (timezone.now() - timedelta(days=3)).isoformat()},
+        ]:
+            with self.subTest(body):
+                self.assertEqual(
+                    self.client.put(url, body, format="json").status_code, 200
+                )
+                self.assert_matches_rebuild()
+        self.client.delete(url)
+        self.assert_matches_rebuild()
+
+    def test_rebuild_command(self):
+        expected = self.rollup()
+        DailySales.objects.filter(created_by=self.user).update(units=0)
+        call_command("rebuild_sales_rollup", user=self.user.email, stdout=StringIO())
+        self.assertEqual(self.rollup(), expected)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_sales_rollup", user="nobody@example.com")
+
+
+class OrderLineSyncTests(TestCase):
+    """Editing an order's lines writes only the lines that changed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, _ = seed_tenant(cls.user, 4, 1, 0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def lines(self, items):
+        return [
+            {"product_id": self.products[i].pk, "quantity": quantity}
+            for i, quantity in items
+        ]
+
+    def test_unchanged_lines_keep_their_price(self):
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customers[0].pk,
+                "items": [
+                    {**line, "price_at_order_time": "2.50"}
+                    for line in self.lines([(0, 2), (1, 1), (2, 1)])
+                ],
+            },
+            format="json",
+        )
+        order = Order.objects.get(pk=response.data["id"])
+        before = {item.product_id: item for item in order.items.all()}
+        Product.objects.filter(created_by=self.user).update(price="9.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(
+                f"/api/orders/{order.pk}/",
+                {"items": self.lines([(0, 2), (1, 3), (3, 1)])},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+        after = {item.product_id: item for item in order.items.all()}
+        unchanged, changed, removed, added = (product.pk for product in self.products)
+        self.assertEqual(after[unchanged].pk, before[unchanged].pk)
+        self.assertEqual(after[unchanged].price_at_order_time, Decimal("2.50"))
+        self.assertEqual(after[changed].pk, before[changed].pk)
+        self.assertEqual(
+            (after[changed].quantity, after[changed].price_at_order_time),
+            (3, Decimal("2.50")),
+        )
+        self.assertEqual(after[added].price_at_order_time, Decimal("9.00"))
+        self.assertNotIn(removed, after)
+        self.assertEqual(order.items.count(), 3)
+
+        writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'api_ordereditem"' in query["sql"].split(" WHERE ")[0]
+            and not query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(
+            [sql.split()[0] for sql in writes], ["DELETE", "UPDATE", "INSERT"], writes
+        )
+        self.assertTrue(writes[0].endswith(f"IN ({before[removed].pk})"))
+        self.assertTrue(writes[1].endswith(f"IN ({before[changed].pk})"))
+
+
+class InventoryTests(TestCase):
+    """Orders take stock, edits and deletes give it back, oversells are refused."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, _ = seed_tenant(cls.user, 2, 1, 0)
+        Product.objects.filter(created_by=cls.user).update(stock=5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stock(self):
+        return list(
+            Product.objects.filter(created_by=self.user)
+            .order_by("pk")
+            .values_list("stock", flat=True)
+        )
+
+    def order(self, *lines):
+        return self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customers[0].pk,
+                "items": [
+                    {
+                        "product_id": self.products[i].pk,
+                        "quantity": quantity,
+                        "price_at_order_time": "2.50",
+                    }
+                    for i, quantity in lines
+                ],
+            },
+            format="json",
+        )
+
+    def test_oversell_is_rejected_without_writing(self):
+        response = self.order((0, 2), (1, 6))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Available: 5, required: 6", str(response.data))
+        self.assertEqual(self.stock(), [5, 5])
+        self.assertFalse(Order.objects.filter(created_by=self.user).exists())
+        self.assertFalse(StockMovement.objects.filter(reason="order").exists())
+
+    def test_repeated_lines_are_checked_together(self):
+        response = self.order((0, 3), (0, 3))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Available: 5, required: 6", str(response.data))
+        self.assertEqual(self.stock(), [5, 5])
+
+    def test_edit_returns_and_takes_the_difference(self):
+        response = self.order((0, 4), (1, 1))
+        self.assertEqual(self.stock(), [1, 4])
+        url = f"/api/orders/{response.data['id']}/"
+
+        response = self.client.put(
+            url,
+            {"items": [{"product_id": self.products[1].pk, "quantity": 3}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(), [5, 2])
+
+        # The order's own 3 units count as available again.
+        response = self.client.put(
+            url,
+            {"items": [{"product_id": self.products[1].pk, "quantity": 6}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Available: 5, required: 6", str(response.data))
+        self.assertEqual(self.stock(), [5, 2])
+
+    def test_delete_returns_stock(self):
+        open_order = self.order((0, 2), (1, 1)).data["id"]
+        canceled = self.order((0, 1)).data["id"]
+        self.client.put(
+            f"/api/orders/{canceled}/", {"status": "canceled"}, format="json"
+        )
+        self.assertEqual(self.stock(), [3, 4])
+
+        self.assertEqual(
+            self.client.delete(f"/api/orders/{open_order}/").status_code, 204
+        )
+        self.assertEqual(self.stock(), [5, 5])
+        # A canceled order already gave its stock back.
+        self.assertEqual(
+            self.client.delete(f"/api/orders/{canceled}/").status_code, 204
+        )
+        self.assertEqual(self.stock(), [5, 5])
+        # The ledger nets out: every unit taken was recorded as given back.
+        self.assertEqual(
+            StockMovement.objects.filter(created_by=self.user)
+            .values("product")
+            .annotate(net=Sum("quantity"))
+            .exclude(net=0)
+            .count(),
+            0,
+        )
+        self.assertEqual(
+            StockMovement.objects.filter(reason=StockMovement.CANCELLATION).count(), 3
+        )
+
+    def test_stale_stock_fails_the_guard(self):
+        product = self.products[0]
+        locked = inventory.lock_products([product.pk], self.user.pk)
+        Product.objects.filter(pk=product.pk).update(stock=1)
+
+        with self.assertRaises(ValidationError):
+            inventory.apply_stock_deltas({product.pk: 2}, locked)
+        self.assertEqual(self.stock(), [1, 5])
+
+
+class OrderBulkTests(TestCase):
+    """POST /api/orders/bulk/ accepts entries independently, up to the limit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.customer = Customer.objects.create(
+            name="C", email="c@example.com", phone="1", address="x", created_by=cls.user
+        )
+        cls.products = Product.objects.bulk_create(
+            Product(
+                name=f"P{i}", SKU=f"P-{i}", price="2.00", stock=3, created_by=cls.user
+            )
+            for i in range(BULK_ORDER_LIMIT)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def entry(self, product_id, quantity=1):
+        return {
+            "customer_id": self.customer.pk,
+            "items": [{"product_id": product_id, "quantity": quantity}],
+        }
+
+    def test_limit_with_distinct_products(self):
+        # One stock, rollup and ranking key per product: the UPDATEs must be
+        # split below SQLite's expression depth limit.
+        response = self.client.post(
+            "/api/orders/bulk/",
+            [self.entry(product.pk, 2) for product in self.products],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], BULK_ORDER_LIMIT)
+        self.assertEqual(
+            set(
+                Product.objects.filter(created_by=self.user).values_list(
+                    "stock", "units_sold"
+                )
+            ),
+            {(1, 2)},
+        )
+        self.assertEqual(
+            DailySales.objects.filter(created_by=self.user, units=2).count(),
+            BULK_ORDER_LIMIT,
+        )
+        self.assertEqual(
+            ProductRanking.objects.filter(
+                created_by=self.user, window=RankingWindow.ALL_TIME, units=2
+            ).count(),
+            BULK_ORDER_LIMIT,
+        )
+
+        response = self.client.post(
+            "/api/orders/bulk/",
+            [self.entry(self.products[0].pk)] * (BULK_ORDER_LIMIT + 1),
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_updates_are_chunked(self):
+        products = {
+            product.pk: product
+            for product in Product.objects.bulk_create(
+                Product(
+                    name=f"M{i}",
+                    SKU=f"M-{i}",
+                    price="1.00",
+                    stock=5,
+                    created_by=self.user,
+                )
+                for i in range(1200)
+            )
+        }
+        with transaction.atomic():
+            inventory.apply_stock_deltas(dict.fromkeys(products, 1), products)
+        self.assertEqual(
+            set(Product.objects.filter(pk__in=products).values_list("stock")), {(4,)}
+        )
+
+        order = Order.objects.create(customer=self.customer, created_by=self.user)
+        items = OrderedItem.objects.bulk_create(
+            OrderedItem(order=order, product_id=pk, quantity=1, price_at_order_time=1)
+            for pk in products
+        )
+        rollups.record_items(items)
+        self.assertEqual(DailySales.objects.filter(created_by=self.user).count(), 1200)
+        rollups.record_items(items, sign=-1)
+        self.assertFalse(DailySales.objects.filter(created_by=self.user).exists())
+
+    def test_rejected_entries_do_not_affect_others(self):
+        product = self.products[0]
+        response = self.client.post(
+            "/api/orders/bulk/",
+            [
+                self.entry(product.pk, 2),
+                self.entry(product.pk, 2),
+                self.entry(0),
+                {"items": []},
+                self.entry(product.pk),
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "error", "error", "error", "created"],
+        )
+        self.assertIn("Not enough stock", response.data["results"][1]["errors"][0])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(StockMovement.objects.filter(product=product).count(), 2)
+
+
+class StockLedgerTests(TestCase):
+    """Every stock change is in the ledger; past stock is read back from it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.customer = Customer.objects.create(
+            name="C", email="c@example.com", phone="1", address="x", created_by=cls.user
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            "/api/products/",
+            {"name": "Widget", "SKU": "W-1", "price": "1.00", "stock": 10},
+            format="json",
+        )
+        self.product = Product.objects.get(pk=response.data["id"])
+
+    def stock(self, when=None):
+        return inventory.stock_at([self.product.pk], when)[self.product.pk]
+
+    def reasons(self):
+        return list(
+            StockMovement.objects.filter(product=self.product)
+            .order_by("id")
+            .values_list("reason", "quantity")
+        )
+
+    def test_writes_are_recorded(self):
+        created = timezone.now()
+        response = self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customer.pk,
+                "items": [
+                    {
+                        "product_id": self.product.pk,
+                        "quantity": 3,
+                        "price_at_order_time": "1.00",
+                    }
+                ],
+            },
+            format="json",
+        )
+        url = f"/api/orders/{response.data['id']}/"
+        ordered = timezone.now()
+        self.client.put(url, {"status": "canceled"}, format="json")
+        self.client.put(url, {"status": "pending"}, format="json")
+        self.client.put(
+            f"/api/products/{self.product.pk}/", {"stock": 20}, format="json"
+        )
+
+        self.assertEqual(
+            self.reasons(),
+            [
+                (StockMovement.ADJUSTMENT, 10),
+                (StockMovement.ORDER, -3),
+                (StockMovement.CANCELLATION, 3),
+                (StockMovement.ORDER, -3),
+                (StockMovement.ADJUSTMENT, 13),
+            ],
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.stock(), self.product.stock)
+        self.assertEqual(self.stock(created), 10)
+        self.assertEqual(self.stock(ordered), 7)
+
+    def test_snapshots(self):
+        before = timezone.now()
+        call_command("snapshot_stock", stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.filter(product=self.product).count(), 1)
+        self.client.put(
+            f"/api/products/{self.product.pk}/", {"stock": 4}, format="json"
+        )
+        # Movements already in a snapshot are not counted twice.
+        self.assertEqual(self.stock(), 4)
+        self.assertEqual(self.stock(before), 10)
+
+        # Lookups start from the snapshot: movements before it may be pruned.
+        with transaction.atomic():
+            inventory.take_snapshots(self.user)
+        StockMovement.objects.filter(product=self.product).delete()
+        self.assertEqual(self.stock(), 4)
+
+    def test_endpoint(self):
+        url = f"/api/products/{self.product.pk}/stock/"
+        response = self.client.get(url)
+        self.assertEqual(response.data["stock"], 10)
+        response = self.client.get(url, {"at": "2000-01-01T00:00:00"})
+        self.assertEqual(response.data["stock"], 0)
+        for value in ["junk", "2024-02-30T00:00:00"]:
+            with self.subTest(value):
+                response = self.client.get(url, {"at": value})
+                self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user("other@example.com", "Other", "2", "pw")
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class AsyncURLConf:
+    urlpatterns = [path("api/", include(urls.with_async_reads(urls.urlpatterns)))]
+
+
+@override_settings(ROOT_URLCONF=AsyncURLConf)
+class AsyncReadViewTests(TestCase):
+    """The async read views answer exactly as the sync views do."""
+
+    URLS = [
+        "/api/products/",
+        "/api/products/?page=2&fields=id,name",
+        "/api/products/?status=low stock",
+        "/api/products/{product}/",
+        "/api/products/0/",
+        "/api/products/?page=99",
+        "/api/customers/",
+        "/api/customers/?exclude=orders",
+        "/api/customers/{customer}/",
+        "/api/orders/",
+        "/api/orders/?status=pending",
+        "/api/orders/?expand=customer.orders",
+        "/api/orders/{order}/",
+        "/api/orders/recent/",
+        "/api/dashboard/summary/",
+        # Handed to the sync views.
+        "/api/products/?q=P1",
+        "/api/orders/?cursor=",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        products, customers, orders = seed_tenant(cls.user, 12, 3, 6)
+        cls.ids = {
+            "product": products[0].pk,
+            "customer": customers[0].pk,
+            "order": orders[0].pk,
+        }
+        cls.token = f"Bearer {AccessToken.for_user(cls.user)}"
+
+    async def test_responses_match_sync_views(self):
+        sync_client = Client(HTTP_AUTHORIZATION=self.token)
+        async_client = AsyncClient(AUTHORIZATION=self.token)
+        for template in self.URLS:
+            url = template.format(**self.ids)
+            with self.subTest(url):
+                await cache.aclear()
+                expected = await sync_to_async(sync_client.get)(url)
+                await cache.aclear()
+                response = await async_client.get(url)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(json.loads(response.content), expected.json())
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    async def test_conditional_and_cached(self):
+        client = AsyncClient(AUTHORIZATION=self.token)
+        first = await client.get("/api/products/")
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual((await client.get("/api/products/"))["X-Cache"], "HIT")
+        response = await client.get(
+            "/api/products/", headers={"If-None-Match": first["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_authentication(self):
+        response = await AsyncClient().get("/api/products/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], 'Bearer realm="api"')
+        response = await AsyncClient(AUTHORIZATION="Bearer junk").get("/api/orders/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+
+class BenchmarkSummaryTests(TestCase):
+    def test_no_samples(self):
+        send = mock.Mock(return_value=200)
+        summary = benchmark.run_endpoint(send, "GET /api/products/", 0, 2)
+        self.assertEqual(summary["requests"], 0)
+        self.assertEqual(summary["p99_ms"], 0)
+        send.assert_not_called()
+
+    def test_samples(self):
+        summary = benchmark.summarize([(0.002, 200), (0.004, 500)], 0.5)
+        self.assertEqual(
+            summary,
+            {
+                "requests": 2,
+                "errors": 1,
+                "throughput_rps": 4.0,
+                "mean_ms": 3.0,
+                "p50_ms": 2.0,
+                "p95_ms": 4.0,
+                "p99_ms": 4.0,
+                "max_ms": 4.0,
+            },
+        )
+
+
+@override_settings(API_PROFILING=True, API_SLOW_REQUEST_MS=0)
+class ProfilingMiddlewareTests(TestCase):
+    """Server-Timing and the slow-request log, in sync and async handlers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        seed_tenant(cls.user, 3, 2, 2)
+        cls.token = f"Bearer {AccessToken.for_user(cls.user)}"
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_profiled(self, response, logs):
+        timing = dict(
+            part.split(";", 1)[0:2] for part in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(set(timing), {"sql", "serialize", "render", "total"})
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["path"], "/api/orders/recent/")
+        self.assertGreater(entry["queries"], 0)
+
+    def test_sync(self):
+        with self.assertLogs("api.profiling", "WARNING") as logs:
+            response = Client(HTTP_AUTHORIZATION=self.token).get("/api/orders/recent/")
+        self.assert_profiled(response, logs)
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    async def test_async(self):
+        # The async ORM runs on the test database connection, which was opened
+        # before the middleware could hook connection_created.
+        await sync_to_async(profiling.add_execute_wrapper)(connection)
+        with self.assertLogs("api.profiling", "WARNING") as logs:
+            response = await AsyncClient(AUTHORIZATION=self.token).get(
+                "/api/orders/recent/"
+            )
+        self.assert_profiled(response, logs)
+
+        async def get_response(request):
+            pass
+
+        self.assertTrue(
+            iscoroutinefunction(profiling.ProfilingMiddleware(get_response))
+        )
+
+
+class TenantCacheTests(TestCase):
+    """Cached list reads are dropped by the tenant's next committed write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.other = User.objects.create_user("other@example.com", "Other", "2", "pw")
+        seed_tenant(cls.user, 3, 2, 2)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_writes_invalidate_cached_lists(self):
+        self.assertEqual(self.get("/api/products/")["X-Cache"], "MISS")
+        self.assertEqual(self.get("/api/products/")["X-Cache"], "HIT")
+
+        # Other tenants' writes leave the cache alone.
+        other = APIClient()
+        other.force_authenticate(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.post(
+                "/api/products/",
+                {"name": "Theirs", "SKU": "T-1", "price": "1.00", "stock": 1},
+                format="json",
+            )
+        self.assertEqual(self.get("/api/products/")["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/products/",
+                {"name": "New", "SKU": "N-1", "price": "1.00", "stock": 1},
+                format="json",
+            )
+        response = self.get("/api/products/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 4)
+
+        self.get("/api/customers/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                f"/api/customers/{Customer.objects.filter(created_by=self.user).first().pk}/",
+                {"name": "Renamed"},
+                format="json",
+            )
+        response = self.get("/api/customers/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn("Renamed", [row["name"] for row in response.data["results"]])
+
+    def test_stats_are_staff_only(self):
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.assertEqual(client.get("/api/cache/stats/").status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/cache/stats/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.json()),
+            {"hits", "misses", "hit_rate", "avg_hit_ms", "avg_miss_ms"},
+        )
+        # The staff flag comes from the cached user state, read once here.
+        self.assertEqual(len(queries), 1)
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged reads answer 304; any write changes the ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, cls.orders = seed_tenant(cls.user, 3, 2, 4)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        return response["ETag"]
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304, url)
+        self.assertEqual(response.content, b"")
+
+    def assert_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_matching_etag_is_not_modified(self):
+        for url in [
+            "/api/products/",
+            f"/api/products/{self.products[0].pk}/",
+            "/api/customers/",
+            f"/api/customers/{self.customers[0].pk}/",
+            "/api/orders/",
+            f"/api/orders/{self.orders[0].pk}/",
+            "/api/orders/recent/",
+        ]:
+            with self.subTest(url=url):
+                self.assert_not_modified(url, self.etag(url))
+
+    def test_write_changes_etag(self):
+        product_url = f"/api/products/{self.products[0].pk}/"
+        urls = ["/api/products/", product_url]
+        etags = [self.etag(url) for url in urls]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(product_url, {"price": "3.00"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assert_modified(url, etag)
+
+    def test_delete_changes_etag(self):
+        # Deleting leaves no newer timestamp behind; the row count catches it.
+        etag = self.etag("/api/orders/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/orders/{self.orders[0].pk}/")
+        self.assertEqual(response.status_code, 204)
+
+        self.assert_modified("/api/orders/", etag)
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_etag_is_per_representation(self):
+        etag = self.etag("/api/products/")
+        response = self.client.get("/api/products/", HTTP_ACCEPT="application/msgpack")
+        self.assertNotEqual(response["ETag"], etag)
+        self.assert_not_modified("/api/products/", etag)
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        seed_tenant(cls.user, 3, 2, 2)
+
+    def setUp(self):
+        authentication.forget(self.user.pk)
+        self.client = Client(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        user_table = f'FROM "{User._meta.db_table}"'
+        return [q["sql"] for q in queries.captured_queries if user_table in q["sql"]]
+
+    def test_user_row_is_read_once_per_ttl(self):
+        self.assertEqual(len(self.user_queries("/api/orders/recent/")), 1)
+        self.assertEqual(self.user_queries("/api/orders/recent/"), [])
+        self.assertEqual(self.user_queries("/api/dashboard/summary/"), [])
+
+    def test_writes_are_attributed_to_the_token_user(self):
+        response = self.client.post(
+            "/api/customers/",
+            {"name": "New", "email": "new@example.com", "phone": "1", "address": "x"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        customer = Customer.objects.get(email="new@example.com")
+        self.assertEqual(customer.created_by_id, self.user.pk)
+
+        bodies = {
+            "/api/customers/": {
+                "name": "Other",
+                "email": "other@example.com",
+                "phone": "1",
+                "address": "x",
+            },
+            "/api/products/": {
+                "name": "New",
+                "SKU": "N-1",
+                "price": "1.00",
+                "stock": 5,
+            },
+            "/api/orders/": {"customer_id": customer.pk, "items": []},
+        }
+        for url, body in bodies.items():
+            with self.subTest(url):
+                response = self.client.post(url, body, content_type="application/json")
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(response.json()["created_by"], self.user.email)
+
+    def test_deactivated_and_deleted_users_are_rejected(self):
+        self.assertEqual(self.client.get("/api/orders/recent/").status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        # Cached until the TTL runs out or the user is saved through the ORM.
+        self.assertEqual(self.client.get("/api/orders/recent/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get("/api/orders/recent/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "user_inactive")
+
+        self.user.delete()
+        response = self.client.get("/api/orders/recent/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "user_not_found")
+
+
+class RowSerializationTests(TestCase):
+    """Lists rendered from ``.values()`` rows match the DRF serializers byte for byte."""
+
+    URLS = [
+        "/api/products/",
+        "/api/products/?fields=id,name,price&cursor=",
+        "/api/products/?all=true",
+        "/api/customers/",
+        "/api/customers/?exclude=orders",
+        "/api/customers/?all=true",
+        "/api/customers/?ordering=-lifetime_value&cursor=",
+        "/api/customers/?ordering=-lifetime_value&cursor=&fields=id,name",
+        "/api/customers/?ordering=order_count&cursor=&exclude=order_count",
+        "/api/customers/?fields=bogus",
+        "/api/products/?fields=bogus&cursor=",
+        "/api/orders/",
+        "/api/orders/?fields=id,items",
+        "/api/orders/?expand=customer.orders",
+        "/api/orders/?all=true",
+        "/api/orders/recent/",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        seed_tenant(cls.user, 12, 3, 8)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def body(self, url, **headers):
+        cache.clear()
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200, url)
+        if response.streaming:
+            return b"".join(response.streaming_content)
+        return response.content
+
+    def test_matches_drf_serializers(self):
+        for url in self.URLS:
+            with self.subTest(url):
+                with mock.patch.object(rows, "plan_for", return_value=None):
+                    expected = self.body(url)
+                self.assertEqual(self.body(url), expected)
+
+    def test_cursor_pages_without_the_sort_field(self):
+        user = User.objects.create_user("paged@example.com", "Paged", "2", "pw")
+        _, customers, _ = seed_tenant(user, 3, 25, 40)
+        self.client.force_authenticate(user)
+
+        seen = []
+        url = "/api/customers/?ordering=-lifetime_value&cursor=&fields=id,name"
+        while url:
+            cache.clear()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            seen.extend(row["id"] for row in response.data["results"])
+            self.assertTrue(
+                all(row.keys() == {"id", "name"} for row in response.data["results"])
+            )
+            url = response.data["next"]
+        self.assertEqual(sorted(seen), sorted(customer.pk for customer in customers))
+
+    def test_unknown_expansions_share_a_plan(self):
+        self.body("/api/orders/?expand=customer.orders")
+        cached = len(rows._plans)
+        for n in range(5):
+            self.body(f"/api/orders/?expand=customer.orders,junk{n}")
+            self.body(f"/api/products/?expand=junk{n}")
+        self.assertLessEqual(len(rows._plans), cached + 1)
+
+    @skipUnless(renderers.msgpack, "msgpack is not installed")
+    def test_msgpack(self):
+        json_response = self.client.get("/api/orders/")
+        response = self.client.get("/api/orders/", HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(
+            renderers.msgpack.unpackb(response.content), json_response.json()
+        )
+        self.assertNotEqual(response["ETag"], json_response["ETag"])
+
+
+class SearchTests(TestCase):
+    """``?q=`` ranks matches first and keeps the list's other filters."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        other = User.objects.create_user("other@example.com", "Other", "2", "pw")
+        Product.objects.bulk_create(
+            Product(
+                name=f"Blue Widget {i}",
+                SKU=f"BW-{i}",
+                price="1.00",
+                stock=50,
+                created_by=cls.user,
+            )
+            for i in range(25)
+        )
+        cls.sold_out = Product.objects.create(
+            name="Blue Widget Max",
+            SKU="BW-MAX",
+            price="1.00",
+            stock=0,
+            created_by=cls.user,
+        )
+        Product.objects.create(
+            name="Blue Widget", SKU="BW-X", price="1.00", stock=0, created_by=other
+        )
+        cls.customer = Customer.objects.create(
+            name="Ada Lovelace",
+            email="ada@example.com",
+            phone="1",
+            address="x",
+            created_by=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def names(self, url):
+        cache.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row["name"] for row in response.data]
+
+    def test_search(self):
+        # Rows with every term come first; trigram matches fill the limit.
+        names = self.names("/api/products/?q=widget max")
+        self.assertEqual(names[0], "Blue Widget Max")
+        self.assertEqual(len(names), 20)
+        self.assertEqual(len(self.names("/api/products/?q=widget")), 20)
+        self.assertEqual(len(self.names("/api/products/?q=widget&limit=30")), 26)
+        # Typos fall back to trigram matches, ranked after exact ones.
+        self.assertEqual(
+            self.names("/api/products/?q=widgte max")[0], "Blue Widget Max"
+        )
+        self.assertEqual(self.names("/api/customers/?q=lovelace"), ["Ada Lovelace"])
+        self.assertEqual(self.names("/api/customers/?q=ad"), ["Ada Lovelace"])
+        self.assertEqual(self.names("/api/customers/?q=nobody"), [])
+
+        # The index follows writes.
+        self.client.put(
+            f"/api/customers/{self.customer.pk}/", {"name": "Ada King"}, format="json"
+        )
+        self.assertEqual(self.names("/api/customers/?q=king"), ["Ada King"])
+        self.assertEqual(self.names("/api/customers/?q=lovelace"), [])
+
+    def test_filters_apply_before_the_limit(self):
+        # 25 in-stock matches would fill the limit of 20 before the filter.
+        self.assertEqual(
+            self.names("/api/products/?q=widget&status=out of stock"),
+            ["Blue Widget Max"],
+        )
+        self.assertEqual(
+            self.names("/api/products/?q=widgte&status=out of stock"),
+            ["Blue Widget Max"],
+        )
+        self.assertEqual(
+            self.names("/api/customers/?q=lovelace&min_lifetime_value=1"), []
+        )
+
+
+class OrderTotalsTests(TestCase):
+    """Stored order totals and customer stats follow every order write."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, cls.orders = seed_tenant(cls.user, 6, 3, 9)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_consistent(self):
+        self.assertEqual(list(totals.check(user=self.user)), [])
+
+    def order_payload(self, customer, quantity=2):
+        return {
+            "customer_id": customer.pk,
+            "items": [
+                {
+                    "product_id": product.pk,
+                    "quantity": quantity,
+                    "price_at_order_time": "2.50",
+                }
+                for product in self.products[:2]
+            ],
+        }
+
+    def test_seeded_rows_are_consistent(self):
+        self.assert_consistent()
+        customer = Customer.objects.get(pk=self.customers[0].pk)
+        # Orders 0, 3 and 6 with three 2.50 lines each.
+        self.assertEqual(customer.order_count, 3)
+        self.assertEqual(str(customer.lifetime_value), "22.50")
+
+    def test_order_writes(self):
+        first, second = self.customers[:2]
+        response = self.client.post(
+            "/api/orders/", self.order_payload(first), format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_amount"], "10.00")
+        self.assertEqual(
+            Customer.objects.get(pk=first.pk).lifetime_value, Decimal("32.50")
+        )
+        self.assert_consistent()
+        url = f"/api/orders/{response.data['id']}/"
+
+        for body in [
+            {"items": self.order_payload(first, 3)["items"]},
+            {"customer_id": second.pk},
+            {"status": "canceled"},
+        ]:
+            with self.subTest(body):
+                self.assertEqual(
+                    self.client.put(url, body, format="json").status_code, 200
+                )
+                self.assert_consistent()
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_consistent()
+
+        response = self.client.post(
+            "/api/orders/bulk/",
+            [self.order_payload(first), self.order_payload(second, 1)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
+
+        url = f"/api/products/{self.products[0].pk}/"
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_consistent()
+
+    def test_sorting_and_filtering(self):
+        Order.objects.filter(customer=self.customers[0]).update(status="canceled")
+        totals.backfill(user=self.user)
+        first, second, third = (customer.pk for customer in self.customers)
+
+        response = self.client.get("/api/customers/?ordering=lifetime_value")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [first, second, third]
+        )
+        response = self.client.get("/api/customers/?ordering=-lifetime_value")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [third, second, first]
+        )
+        response = self.client.get("/api/customers/?ordering=-last_order_at")
+        self.assertEqual(len(response.data["results"]), 2)
+
+        response = self.client.get("/api/customers/?min_lifetime_value=20")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [second, third]
+        )
+
+    def test_check_and_backfill_commands(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(total_amount=0)
+        with self.assertRaises(CommandError):
+            call_command("check_totals", stdout=StringIO())
+        call_command("backfill_totals", stdout=StringIO())
+        call_command("check_totals", stdout=StringIO())
+
+
+class SyntheticDataTests(TestCase):
+    """``generate_data`` writes the same derived rows the rebuild commands do."""
+
+    def setUp(self):
+        call_command(
+            "generate_data",
+            users=2,
+            products=15,
+            customers=8,
+            orders=120,
+            days=90,
+            batch_size=40,
+            stdout=StringIO(),
+        )
+        self.users = list(User.objects.filter(email__startswith="load-0-"))
+
+    def rows(self, model, *fields):
+        return sorted(
+            model.objects.filter(created_by__in=self.users).values_list(*fields)
+        )
+
+    def test_totals_match_orders(self):
+        self.assertEqual(len(self.users), 2)
+        for user in self.users:
+            self.assertEqual(list(totals.check(user)), [])
+            sold = dict(
+                OrderedItem.objects.filter(order__created_by=user)
+                .exclude(order__status=Order.CANCELED)
+                .values_list("product")
+                .annotate(units=Sum("quantity"))
+            )
+            for pk, units_sold in Product.objects.filter(created_by=user).values_list(
+                "pk", "units_sold"
+            ):
+                self.assertEqual(units_sold, sold.get(pk, 0))
+            products = Product.objects.filter(created_by=user)
+            self.assertEqual(
+                inventory.stock_at(products.values_list("pk", flat=True)),
+                dict(products.values_list("pk", "stock")),
+            )
+
+    def test_rollup_matches_rebuild(self):
+        fields = ["created_by", "day", "product", "units", "revenue", "order_count"]
+        generated = self.rows(DailySales, *fields)
+        self.assertTrue(generated)
+        for user in self.users:
+            rollups.rebuild(user=user)
+        self.assertEqual(generated, self.rows(DailySales, *fields))
+
+    def test_rankings_match_rebuild(self):
+        generated = (
+            self.rows(ProductRanking, "created_by", "window", "product", "units"),
+            self.rows(RankingWindow, "created_by", "window", "start"),
+        )
+        self.assertTrue(generated[0])
+        for user in self.users:
+            rankings.rebuild(user=user)
+        self.assertEqual(
+            generated,
+            (
+                self.rows(ProductRanking, "created_by", "window", "product", "units"),
+                self.rows(RankingWindow, "created_by", "window", "start"),
+            ),
+        )
+
+
+class ProductRankingTests(TestCase):
+    """The top-selling rankings follow every order write and window move."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.products, cls.customers, _ = seed_tenant(cls.user, 6, 3, 9)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_consistent(self):
+        for window, start in RankingWindow.objects.filter(
+            created_by=self.user
+        ).values_list("window", "start"):
+            stored = dict(
+                ProductRanking.objects.filter(
+                    created_by=self.user, window=window, units__gt=0
+                ).values_list("product", "units")
+            )
+            self.assertEqual(stored, rankings.sold_units(self.user.pk, start), window)
+
+    def order_payload(self, product, quantity, **fields):
+        return {
+            "customer_id": self.customers[0].pk,
+            "items": [
+                {
+                    "product_id": product.pk,
+                    "quantity": quantity,
+                    "price_at_order_time": "2.50",
+                }
+            ],
+            **fields,
+        }
+
+    def top(self, query=""):
+        cache.clear()
+        response = self.client.get(f"/api/products/?top=true&limit=1{query}")
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data]
+
+    def test_order_writes(self):
+        product = self.products[5]
+        response = self.client.post(
+            "/api/orders/", self.order_payload(product, 20), format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
+        self.assertEqual(self.top(), [product.pk])
+        url = f"/api/orders/{response.data['id']}/"
+
+        for body in [
+            {"items": self.order_payload(self.products[4], 30)["items"]},
+            {"status": "canceled"},
+            {"status": "pending"},
+            {"date": (timezone.now() - timedelta(days=40)).isoformat()},
+        ]:
+            with self.subTest(body):
+                self.assertEqual(
+                    self.client.put(url, body, format="json").status_code, 200
+                )
+                self.assert_consistent()
+        self.assertEqual(self.top(), [self.products[4].pk])
+        self.assertNotEqual(self.top("&window=30d"), [self.products[4].pk])
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assert_consistent()
+
+        response = self.client.post(
+            "/api/orders/bulk/",
+            [self.order_payload(product, 5), self.order_payload(product, 5)],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
+        self.assertEqual(self.top("&window=month"), [product.pk])
+
+    def test_built_on_first_write(self):
+        ProductRanking.objects.filter(created_by=self.user).delete()
+        RankingWindow.objects.filter(created_by=self.user).delete()
+        response = self.client.post(
+            "/api/orders/", self.order_payload(self.products[5], 20), format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
+
+    def test_windows_advance(self):
+        today = timezone.localdate()
+        self.client.post(
+            "/api/orders/",
+            self.order_payload(
+                self.products[5], 20, date=(timezone.now() - timedelta(days=20))
+            ),
+            format="json",
+        )
+        later = today + timedelta(days=15)
+        for window in [RankingWindow.LAST_30_DAYS, RankingWindow.THIS_MONTH]:
+            rankings.advance(self.user.pk, window, today=later)
+        self.assertEqual(
+            RankingWindow.objects.get(
+                created_by=self.user, window=RankingWindow.LAST_30_DAYS
+            ).start,
+            later - timedelta(days=29),
+        )
+        self.assert_consistent()
+        units = dict(
+            ProductRanking.objects.filter(
+                created_by=self.user, product=self.products[5]
+            ).values_list("window", "units")
+        )
+        self.assertEqual(
+            units[RankingWindow.ALL_TIME], units[RankingWindow.LAST_30_DAYS] + 20
+        )
+
+    def test_many_products(self):
+        # Each product is a term of the ranking UPDATE; SQLite caps expression
+        # depth at 1000.
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"M{i}", SKU=f"M-{i}", price="1.00", stock=5, created_by=self.user
+            )
+            for i in range(1200)
+        )
+        order = Order.objects.create(
+            customer=self.customers[0],
+            created_by=self.user,
+            date=timezone.now() - timedelta(days=20),
+        )
+        items = OrderedItem.objects.bulk_create(
+            OrderedItem(
+                order=order, product=product, quantity=1, price_at_order_time="1.00"
+            )
+            for product in products
+        )
+        rankings.record_items(items[:BULK_ORDER_LIMIT])
+        rankings.record_items(items[BULK_ORDER_LIMIT:])
+        self.assert_consistent()
+
+        rankings.advance(
+            self.user.pk,
+            RankingWindow.LAST_30_DAYS,
+            today=timezone.localdate() + timedelta(days=15),
+        )
+        self.assert_consistent()
+        self.assertFalse(
+            ProductRanking.objects.filter(
+                created_by=self.user,
+                window=RankingWindow.LAST_30_DAYS,
+                product__in=products,
+                units__gt=0,
+            ).exists()
+        )
+
+    def test_rebuild_command(self):
+        ProductRanking.objects.filter(created_by=self.user).update(units=0)
+        call_command("rebuild_product_rankings", stdout=StringIO())
+        self.assert_consistent()
+        self.assertTrue(self.top())
+
+    def test_top_fills_up_with_unsold_products(self):
+        user = User.objects.create_user("new@example.com", "New", "2", "pw")
+        products, _, _ = seed_tenant(user, 7, 1, 1, items_per_order=2)
+        self.client.force_authenticate(user)
+        sold = set(
+            OrderedItem.objects.filter(order__created_by=user).values_list(
+                "product", flat=True
+            )
+        )
+        self.assertEqual(len(sold), 2)
+
+        for window in ["all", "30d"]:
+            with self.subTest(window):
+                cache.clear()
+                response = self.client.get(f"/api/products/?top=true&window={window}")
+                ids = [row["id"] for row in response.data]
+                self.assertEqual(len(ids), 5)
+                self.assertEqual(set(ids[:2]), sold)
+
+        response = self.client.get("/api/products/?top=true&limit=10")
+        self.assertEqual(len(response.data), len(products))
+
+
+class StockAlertTests(TestCase):
+    """Alerts are raised by the writes that move a product across its threshold."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.customer = Customer.objects.create(
+            name="C", email="c@example.com", phone="1", address="x", created_by=cls.user
+        )
+        cls.product = Product.objects.create(
+            name="Widget",
+            SKU="W-1",
+            price="1.00",
+            stock=15,
+            reorder_threshold=5,
+            created_by=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def order(self, quantity):
+        return self.client.post(
+            "/api/orders/",
+            {
+                "customer_id": self.customer.pk,
+                "items": [
+                    {
+                        "product_id": self.product.pk,
+                        "quantity": quantity,
+                        "price_at_order_time": "1.00",
+                    }
+                ],
+            },
+            format="json",
+        )
+
+    def levels(self):
+        return list(
+            StockAlert.objects.filter(product=self.product)
+            .order_by("id")
+            .values_list("level", "stock")
+        )
+
+    def test_alerts_follow_threshold_crossings(self):
+        self.assertEqual(self.order(5).status_code, 201)
+        self.assertEqual(self.levels(), [])
+
+        response = self.order(6)
+        self.assertEqual(self.levels(), [("low_stock", 4)])
+
+        self.order(1)
+        self.assertEqual(len(self.levels()), 1)
+
+        url = f"/api/orders/{response.data['id']}/"
+        self.client.put(url, {"status": "canceled"}, format="json")
+        self.assertEqual(self.levels()[-1], ("in_stock", 9))
+
+        product_url = f"/api/products/{self.product.pk}/"
+        self.client.put(product_url, {"stock": 0}, format="json")
+        self.client.put(product_url, {"reorder_threshold": 0}, format="json")
+        self.client.put(
+            product_url, {"stock": 3, "reorder_threshold": 3}, format="json"
+        )
+        self.assertEqual(self.levels()[-2:], [("out_of_stock", 0), ("low_stock", 3)])
+
+    def test_polling(self):
+        self.order(11)
+        response = self.client.get("/api/alerts/")
+        self.assertEqual(
+            [alert["level"] for alert in response.data["results"]], ["low_stock"]
+        )
+        self.assertEqual(response.data["results"][0]["product_name"], "Widget")
+        last = response.data["last"]
+
+        response = self.client.get(f"/api/alerts/?after={last}")
+        self.assertEqual(response.data, {"results": [], "last": last})
+        self.client.put(
+            f"/api/products/{self.product.pk}/", {"stock": 0}, format="json"
+        )
+        response = self.client.get(f"/api/alerts/?after={last}")
+        self.assertEqual(
+            [alert["level"] for alert in response.data["results"]], ["out_of_stock"]
+        )
+
+        response = self.client.get("/api/products/?status=below threshold")
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [self.product.pk]
+        )
+
+
+class EventsURLConf:
+    urlpatterns = [
+        path(
+            "api/",
+            include(
+                urls.with_async_reads(urls.urlpatterns)
+                + [path("events/", async_views.event_stream)]
+            ),
+        )
+    ]
+
+
+class LiveEventTests(TestCase):
+    """Committed writes reach the tenant's event stream."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("owner@example.com", "Owner", "1", "pw")
+        cls.customer = Customer.objects.create(
+            name="C", email="c@example.com", phone="1", address="x", created_by=cls.user
+        )
+        cls.product = Product.objects.create(
+            name="Widget",
+            SKU="W-1",
+            price="2.50",
+            stock=15,
+            reorder_threshold=5,
+            created_by=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.broker = events.LocalBroker()
+        patcher = mock.patch.object(events, "_broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self, call):
+        with mock.patch.object(self.broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = call()
+        self.assertLess(response.status_code, 300)
+        for (tenant_id, _), _ in publish.call_args_list:
+            self.assertEqual(tenant_id, self.user.pk)
+        return response, [
+            (event["type"], event["data"]) for (_, event), _ in publish.call_args_list
+        ]
+
+    def test_order_events(self):
+        response, published = self.published(
+            lambda: self.client.post(
+                "/api/orders/",
+                {
+                    "customer_id": self.customer.pk,
+                    "items": [
+                        {
+                            "product_id": self.product.pk,
+                            "quantity": 11,
+                            "price_at_order_time": "2.50",
+                        }
+                    ],
+                },
+                format="json",
+            )
+        )
+        published = dict(
+            (kind, data) for kind, data in published if kind != "metrics.delta"
+        ) | {"metrics": [data for kind, data in published if kind == "metrics.delta"]}
+        self.assertEqual(published["order.created"]["id"], response.data["id"])
+        self.assertEqual(
+            published["stock.changed"],
+            {"products": [{"id": self.product.pk, "stock": 4, "level": "low_stock"}]},
+        )
+        self.assertIn(
+            {"products": {"low_stock": 1}}, published["metrics"], published["metrics"]
+        )
+        self.assertIn(
+            {
+                "orders_this_month": 1,
+                "revenue_this_month": Decimal("27.50"),
+                "orders_by_status": {"pending": 1},
+            },
+            published["metrics"],
+        )
+
+        url = f"/api/orders/{response.data['id']}/"
+        _, published = self.published(
+            lambda: self.client.put(url, {"status": "shipped"}, format="json")
+        )
+        self.assertEqual(
+            [kind for kind, _ in published], ["order.updated", "metrics.delta"]
+        )
+        self.assertEqual(
+            published[1][1], {"orders_by_status": {"pending": -1, "shipped": 1}}
+        )
+
+        _, published = self.published(lambda: self.client.delete(url))
+        self.assertIn(("order.deleted", {"id": response.data["id"]}), published)
+        self.assertIn(
+            (
+                "metrics.delta",
+                {
+                    "orders_this_month": -1,
+                    "revenue_this_month": Decimal("-27.50"),
+                    "orders_by_status": {"shipped": -1},
+                },
+            ),
+            published,
+        )
+
+    def test_rolled_back_writes_are_not_published(self):
+        with mock.patch.object(self.broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    "/api/orders/",
+                    {
+                        "customer_id": self.customer.pk,
+                        "items": [
+                            {
+                                "product_id": self.product.pk,
+                                "quantity": 99,
+                                "price_at_order_time": "2.50",
+                            }
+                        ],
+                    },
+                    format="json",
+                )
+        self.assertEqual(response.status_code, 400)
+        publish.assert_not_called()
+
+    async def test_broker_drops_backlog_for_resync(self):
+        broker = events.LocalBroker(queue_size=2)
+        async with broker.subscribe(1) as queue, broker.subscribe(2) as other:
+            for n in range(3):
+                broker.publish(1, {"type": "order.deleted", "data": {"id": n}})
+            await asyncio.sleep(0)
+            self.assertEqual(queue.get_nowait(), events.RESYNC)
+            self.assertTrue(queue.empty())
+            self.assertTrue(other.empty())
+        self.assertEqual(broker._subscribers, {})
+
+    @override_settings(ROOT_URLCONF=EventsURLConf)
+    async def test_stream(self):
+        response = await AsyncClient().get("/api/events/")
+        self.assertEqual(response.status_code, 401)
+
+        token = AccessToken.for_user(self.user)
+        response = await AsyncClient().get(f"/api/events/?token={token}")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(len(self.broker._subscribers[self.user.pk]), 1)
+        async with contextlib.aclosing(aiter(response.streaming_content)) as chunks:
+            self.assertIn(b"event: ready\n", await anext(chunks))
+
+            self.broker.publish(
+                self.user.pk, {"type": "order.deleted", "data": {"id": 7}}
+            )
+            self.assertEqual(
+                await anext(chunks), b'event: order.deleted\ndata: {"id":7}\n\n'
+            )
+            with override_settings(API_EVENTS_HEARTBEAT=0.01):
+                self.assertEqual(await anext(chunks), b": keep-alive\n\n")
+        # As the ASGI handler does once the response ends or the client leaves.
+        await sync_to_async(response.close)()
+        self.assertEqual(self.broker._subscribers, {})
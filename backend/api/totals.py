@@ -0,0 +1,126 @@
+"""Stored order values and per-customer lifetime stats.
+
+``Order.total_amount`` is the sum of the order's lines at their
+``price_at_order_time`` and is written with the lines. A customer's
+``order_count``, ``lifetime_value`` and ``last_order_at`` cover the
+customer's non-canceled orders; every order write recomputes them for the
+customers it touches with ``refresh_customers()``, in the same transaction.
+"""
+
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Customer, Order, OrderedItem
+
+AMOUNT = DecimalField(max_digits=14, decimal_places=2)
+ZERO = Decimal("0.00")
+
+STATS_FIELDS = ["order_count", "lifetime_value", "last_order_at"]
+
+
+def order_total(items):
+    """Value of ``OrderedItem`` rows, e.g. an order's prefetched items."""
+    return sum((item.price_at_order_time * item.quantity for item in items), ZERO)
+
+
+def amount_expression():
+    """``total_amount`` of the outer order, computed from its lines."""
+    lines = OrderedItem.objects.filter(order_id=OuterRef("pk")).values("order_id")
+    total = lines.annotate(
+        total=Sum(F("price_at_order_time") * F("quantity"), output_field=AMOUNT)
+    ).values("total")
+    return Coalesce(Subquery(total), ZERO, output_field=AMOUNT)
+
+
+def stats_expressions():
+    """The stored stats of the outer customer, computed from its orders."""
+    orders = (
+        Order.objects.filter(customer_id=OuterRef("pk"))
+        .exclude(status=Order.CANCELED)
+        .values("customer_id")
+    )
+    return {
+        "order_count": Coalesce(
+            Subquery(orders.annotate(count=Count("pk")).values("count")), 0
+        ),
+        "lifetime_value": Coalesce(
+            Subquery(
+                orders.annotate(value=Sum("total_amount", output_field=AMOUNT)).values(
+                    "value"
+                )
+            ),
+            ZERO,
+            output_field=AMOUNT,
+        ),
+        "last_order_at": Subquery(orders.annotate(last=Max("date")).values("last")),
+    }
+
+
+def refresh_customers(customer_ids):
+    """Recompute the stats of these customers in one UPDATE."""
+    customer_ids = {pk for pk in customer_ids if pk is not None}
+    if customer_ids:
+        Customer.objects.filter(pk__in=customer_ids).update(**stats_expressions())
+
+
+def refresh_orders(order_ids):
+    """Recompute these orders' ``total_amount`` from their lines.
+
+    Returns the ids of their customers, whose stats need refreshing too.
+    """
+    orders = Order.objects.filter(pk__in=list(order_ids))
+    customer_ids = set(orders.values_list("customer_id", flat=True))
+    orders.update(total_amount=amount_expression())
+    return customer_ids
+
+
+def backfill(user=None):
+    """Recompute every stored order total and customer stat (or one user's).
+
+    Returns (orders, customers) updated.
+    """
+    orders = Order.objects.all()
+    customers = Customer.objects.all()
+    if user is not None:
+        orders = orders.filter(created_by=user)
+        customers = customers.filter(created_by=user)
+    return (
+        orders.update(total_amount=amount_expression()),
+        customers.update(**stats_expressions()),
+    )
+
+
+def check(user=None):
+    """Yield the rows whose stored values differ from their lines and orders.
+
+    Each entry is (model name, pk, {field: (stored, expected)}). Values are
+    compared after conversion to Python, as SQLite sums decimals as floats.
+    """
+    orders = Order.objects.all()
+    customers = Customer.objects.all()
+    if user is not None:
+        orders = orders.filter(created_by=user)
+        customers = customers.filter(created_by=user)
+
+    checks = [
+        (orders, ["total_amount"], {"total_amount": amount_expression()}),
+        (customers, STATS_FIELDS, stats_expressions()),
+    ]
+    for queryset, fields, expressions in checks:
+        expected = {f"expected_{name}": value for name, value in expressions.items()}
+        rows = (
+            queryset.annotate(**expected)
+            .values("pk", *fields, *expected)
+            .order_by("pk")
+            .iterator()
+        )
+        for row in rows:
+            drift = {
+                name: (row[name], row[f"expected_{name}"])
+                for name in fields
+                if row[name] != row[f"expected_{name}"]
+            }
+            if drift:
+                yield queryset.model.__name__, row["pk"], drift
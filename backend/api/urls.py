@@ -1,14 +1,22 @@
+from django.conf import settings
 from django.urls import path
+
+from . import async_views
 from .views import (
     RegisterUserView,
     LoginUserView,
     ProductView,
     ProductDetailView,
+    ProductStockView,
     CustomerView,
     CustomerDetailView,
     OrderView,
+    OrderBulkView,
     RecentOrdersView,
     OrderDetailView,
+    DashboardSummaryView,
+    StockAlertView,
+    CacheStatsView,
 )
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -22,9 +30,44 @@ urlpatterns = [
     path("auth/login/", LoginUserView.as_view()),
     path("products/", ProductView.as_view()),
     path("products/<int:pk>/", ProductDetailView.as_view()),
+    path("products/<int:pk>/stock/", ProductStockView.as_view()),
     path("customers/", CustomerView.as_view()),
     path("customers/<int:pk>/", CustomerDetailView.as_view()),
     path("orders/", OrderView.as_view()),
     path("orders/<int:pk>/", OrderDetailView.as_view()),
+    path("orders/bulk/", OrderBulkView.as_view()),
     path("orders/recent/", RecentOrdersView.as_view()),
+    path("dashboard/summary/", DashboardSummaryView.as_view()),
+    path("alerts/", StockAlertView.as_view()),
+    path("cache/stats/", CacheStatsView.as_view()),
 ]
+
+ASYNC_READS = {
+    "products/": async_views.product_list_view,
+    "products/<int:pk>/": async_views.product_detail_view,
+    "customers/": async_views.customer_list_view,
+    "customers/<int:pk>/": async_views.customer_detail_view,
+    "orders/": async_views.order_list_view,
+    "orders/<int:pk>/": async_views.order_detail_view,
+    "orders/recent/": async_views.recent_orders_view,
+    "dashboard/summary/": async_views.dashboard_summary_view,
+}
+
+
+def with_async_reads(patterns):
+    """Serve GETs of the ``ASYNC_READS`` routes from their async views."""
+    routes = []
+    for pattern in patterns:
+        route = str(pattern.pattern)
+        if route in ASYNC_READS:
+            view = async_views.with_async_get(ASYNC_READS[route], pattern.callback)
+            pattern = path(route, view)
+        routes.append(pattern)
+    return routes
+
+
+if settings.API_ASYNC_VIEWS:
+    urlpatterns = with_async_reads(urlpatterns)
+
+if settings.API_EVENTS_STREAM:
+    urlpatterns.append(path("events/", async_views.event_stream))
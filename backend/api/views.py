@@ -1,17 +1,272 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from rest_framework.pagination import PageNumberPagination
-
-from .models import Product, Customer, Order
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Q, Sum, prefetch_related_objects
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .models import (
+    Product,
+    Customer,
+    Order,
+    OrderedItem,
+    DailySales,
+    RankingWindow,
+    StockAlert,
+    StockMovement,
+)
 from .serializers import (
     UserSerializer,
     ProductSerializer,
     CustomerSerializer,
     OrderSerializer,
+    StockAlertSerializer,
+    order_items,
+    requested_expansions,
 )
+from . import bulk, caching, inventory, rankings, rollups, rows, search, totals
+from .renderers import dumps
+from .conditional import conditional_get
+
+logger = logging.getLogger(__name__)
+
+# Products at or below their reorder threshold, served by product_owner_below_idx.
+BELOW_THRESHOLD = Q(stock__lte=F("reorder_threshold"))
+LOW_STOCK = Q(BELOW_THRESHOLD, stock__gt=0)
+ALERT_LIMIT = 100
+BULK_ORDER_LIMIT = 500
+CUSTOMER_ORDERING = {"lifetime_value", "order_count", "last_order_at"}
+STREAM_CHUNK_SIZE = 500
+
+
+def get_paginator(request, page_size, ordering=("id",)):
+    """Page-number pagination, or keyset pagination on ``id`` when ``?cursor=`` is sent.
+
+    The cursor mode skips the ``COUNT(*)`` and replaces ``OFFSET`` with an
+    ``id > last_seen`` filter, so deep pages cost the same as the first.
+    ``ordering`` must be the ordering of the queryset being paginated.
+    """
+    if "cursor" in request.query_params:
+        paginator = CursorPagination()
+        paginator.ordering = ordering
+    else:
+        paginator = PageNumberPagination()
+    paginator.page_size = page_size
+    return paginator
+
+
+def search_limit(request):
+    try:
+        limit = int(request.query_params.get("limit", search.DEFAULT_LIMIT))
+    except ValueError:
+        limit = search.DEFAULT_LIMIT
+    return max(1, min(limit, search.MAX_LIMIT))
+
+
+def stream_json_list(queryset, serializer_class, context=None):
+    """Stream a JSON array, serializing ``STREAM_CHUNK_SIZE`` rows at a time.
+
+    Rows are read with ``.iterator()`` so only one chunk (plus its prefetched
+    relations) is held in memory regardless of table size.
+    """
+    plan = rows.plan_for(serializer_class, context["request"])
+    if plan is not None:
+        queryset = plan.values(queryset)
+
+    def chunks():
+        yield b"["
+        batch = []
+        first = True
+        for obj in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            batch.append(obj)
+            if len(batch) == STREAM_CHUNK_SIZE:
+                yield encode(batch, first)
+                batch = []
+                first = False
+        if batch:
+            yield encode(batch, first)
+        yield b"]"
+
+    def encode(batch, first):
+        if plan is not None:
+            data = plan.render(batch)
+        else:
+            data = serializer_class(batch, many=True, context=context).data
+        body = dumps(data)[1:-1]
+        return body if first else b"," + body
+
+    return StreamingHttpResponse(chunks(), content_type="application/json")
+
+
+def serialize_list(request, objects, serializer_class):
+    """Output of ``serializer_class`` for a list from ``row_list()``."""
+    plan = rows.plan_for(serializer_class, request)
+    if plan is not None:
+        return plan.render(objects)
+    return serializer_class(objects, many=True, context={"request": request}).data
+
+
+def row_list(request, queryset, serializer_class):
+    """``queryset`` as dict rows when ``serializer_class`` can render from them."""
+    plan = rows.plan_for(serializer_class, request)
+    return queryset if plan is None else plan.values(queryset)
+
+
+def paginated_list(request, queryset, serializer_class, page_size):
+    paginator = get_paginator(request, page_size, queryset.query.order_by)
+    page = paginator.paginate_queryset(
+        row_list(request, queryset, serializer_class), request
+    )
+    return paginator.get_paginated_response(
+        serialize_list(request, page, serializer_class)
+    )
+
+
+def tenant_rows(request, *models):
+    return [model.objects.filter(created_by=request.user) for model in models]
+
+
+def top_window(request):
+    """The ``?window=`` of a ``?top=true`` request, all time by default."""
+    window = request.query_params.get("window", "").lower()
+    return window if window in rankings.WINDOWS else RankingWindow.ALL_TIME
+
+
+def top_limit(request):
+    try:
+        limit = int(request.query_params.get("limit", rankings.DEFAULT_LIMIT))
+    except ValueError:
+        limit = rankings.DEFAULT_LIMIT
+    return max(1, min(limit, rankings.MAX_LIMIT))
+
+
+def product_list_state(request):
+    # The ?top=true ranking moves with every order write, and with the date:
+    # the window row only matches today's start once it has been advanced.
+    if request.query_params.get("top", "false").lower() == "true":
+        window = top_window(request)
+        current = RankingWindow.objects.filter(
+            created_by=request.user,
+            window=window,
+            start=rankings.window_start(window),
+        )
+        return [filtered_products(request), *tenant_rows(request, Order), current]
+    return [filtered_products(request)]
+
+
+def product_detail_state(request, pk):
+    return [Product.objects.filter(pk=pk, created_by=request.user)]
+
+
+def customer_list_state(request):
+    customers = Customer.objects.filter(created_by=request.user)
+    return [customers, *tenant_rows(request, Order, Product)]
+
+
+def customer_detail_state(request, pk):
+    customers = Customer.objects.filter(pk=pk, created_by=request.user)
+    orders = Order.objects.filter(customer_id=pk, created_by=request.user)
+    return [customers, orders, *tenant_rows(request, Product)]
+
+
+def order_list_state(request):
+    state = [filtered_orders(request), *tenant_rows(request, Customer, Product)]
+    if "customer.orders" in requested_expansions(request):
+        state += tenant_rows(request, Order)
+    return state
+
+
+def order_detail_state(request, pk):
+    orders = Order.objects.filter(pk=pk, created_by=request.user)
+    state = [orders, *tenant_rows(request, Customer, Product)]
+    if "customer.orders" in requested_expansions(request):
+        state += tenant_rows(request, Order)
+    return state
+
+
+def recent_orders_state(request):
+    return tenant_rows(request, Order, Customer, Product)
+
+
+def filtered_products(request):
+    status_filter = request.query_params.get("status", "").lower()
+
+    products = Product.objects.filter(created_by=request.user)
+
+    if status_filter == "active":
+        products = products.filter(status="active")
+    elif status_filter == "inactive":
+        products = products.filter(status="inactive")
+    elif status_filter == "low stock":
+        products = products.filter(LOW_STOCK)
+    elif status_filter == "below threshold":
+        products = products.filter(BELOW_THRESHOLD)
+    elif status_filter == "out of stock":
+        products = products.filter(stock=0)
+    return products
+
+
+def filtered_orders(request):
+    orders = order_queryset(request).order_by("id")
+
+    status_param = request.query_params.get("status")
+    if status_param and status_param.lower() != "all":
+        orders = orders.filter(status=status_param.lower())
+    return orders
+
+
+def filtered_customers(request):
+    """Customers ordered by ``?ordering=`` and filtered by ``?min_lifetime_value=``.
+
+    Both use the stored stats columns, so they are served by the
+    ``(created_by, <stat>)`` indexes. Ordering by ``last_order_at`` lists
+    only customers who have ordered, which keeps the column usable as a
+    ``?cursor=`` position. Unknown values are ignored.
+    """
+    customers = customer_queryset(request)
+
+    try:
+        minimum = Decimal(request.query_params.get("min_lifetime_value", ""))
+    except InvalidOperation:
+        minimum = None
+    if minimum is not None and minimum.is_finite():
+        customers = customers.filter(lifetime_value__gte=minimum)
+
+    ordering = request.query_params.get("ordering", "")
+    if ordering.lstrip("-") in CUSTOMER_ORDERING:
+        direction = "-" if ordering.startswith("-") else ""
+        if ordering.endswith("last_order_at"):
+            customers = customers.filter(last_order_at__isnull=False)
+        return customers.order_by(ordering, f"{direction}id")
+    return customers.order_by("id")
+
+
+def order_queryset(request):
+    """Orders of the requesting user with everything OrderSerializer renders."""
+    orders = Order.objects.filter(created_by=request.user)
+    if "customer.orders" in requested_expansions(
+        request
+    ) and "customer" in OrderSerializer.selected_fields(request):
+        orders = orders.select_related("customer__created_by").prefetch_related(
+            Prefetch("customer__orders__items", queryset=order_items())
+        )
+    return OrderSerializer.shape_queryset(orders, request)
+
+
+def customer_queryset(request):
+    return CustomerSerializer.shape_queryset(
+        Customer.objects.filter(created_by=request.user), request
+    )
 
 
 class RegisterUserView(APIView):
@@ -57,39 +312,42 @@ class LoginUserView(APIView):
 class ProductView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(product_list_state)
+    @caching.cached_get
     def get(self, request):
         top = request.query_params.get("top", "false").lower() == "true"
         fetch_all = request.query_params.get("all", "false").lower() == "true"
-        status_filter = request.query_params.get("status", "").lower()
 
-        products = Product.objects.filter(created_by=request.user)
+        products = filtered_products(request)
+        shaped = ProductSerializer.shape_queryset(products, request)
 
-        if status_filter == "active":
-            products = products.filter(status="active")
-        elif status_filter == "inactive":
-            products = products.filter(status="inactive")
-        elif status_filter == "low stock":
-            products = products.filter(stock__gt=0, stock__lte=10)
-        elif status_filter == "out of stock":
-            products = products.filter(stock=0)
+        query = request.query_params.get("q", "").strip()
+        if query:
+            results = search.search(shaped, query, request.user, search_limit(request))
+            serializer = ProductSerializer(
+                results, many=True, context={"request": request}
+            )
+            return Response(serializer.data)
 
         if top:
-            products = products.order_by("-units_sold")[:5]
-            serializer = ProductSerializer(products, many=True)
+            top_ids = rankings.top(
+                request.user.pk,
+                top_window(request),
+                top_limit(request),
+                products if "status" in request.query_params else None,
+            )
+            by_id = shaped.in_bulk(top_ids)
+            serializer = ProductSerializer(
+                [by_id[pk] for pk in top_ids], many=True, context={"request": request}
+            )
             return Response(serializer.data)
 
         if fetch_all:
-            products = products.order_by("id")
-            serializer = ProductSerializer(products, many=True)
-            return Response(serializer.data)
+            return stream_json_list(
+                shaped.order_by("id"), ProductSerializer, {"request": request}
+            )
 
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
-        paginated_products = paginator.paginate_queryset(
-            products.order_by("id"), request
-        )
-        serializer = ProductSerializer(paginated_products, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginated_list(request, shaped.order_by("id"), ProductSerializer, 10)
 
     def post(self, request):
         serializer = ProductSerializer(data=request.data)
@@ -108,13 +366,18 @@ class ProductDetailView(APIView):
         except Product.DoesNotExist:
             return None
 
+    @conditional_get(product_detail_state)
+    @caching.cached_get
     def get(self, request, pk):
-        product = self.get_object(pk, request.user)
+        products = Product.objects.filter(created_by=request.user)
+        product = (
+            ProductSerializer.shape_queryset(products, request).filter(pk=pk).first()
+        )
         if not product:
             return Response(
                 {"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        serializer = ProductSerializer(product)
+        serializer = ProductSerializer(product, context={"request": request})
         return Response(serializer.data)
 
     def put(self, request, pk):
@@ -135,30 +398,72 @@ class ProductDetailView(APIView):
             return Response(
                 {"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        product.delete()
+        with transaction.atomic():
+            # The product's order lines go with it.
+            order_ids = set(
+                OrderedItem.objects.filter(product=product).values_list(
+                    "order_id", flat=True
+                )
+            )
+            product.delete()
+            totals.refresh_customers(totals.refresh_orders(order_ids))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ProductStockView(APIView):
+    """Stock of one product at ``?at=<ISO datetime>`` (default: now), from the ledger."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        if not Product.objects.filter(pk=pk, created_by=request.user).exists():
+            return Response(
+                {"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        when = None
+        if "at" in request.query_params:
+            try:
+                when = parse_datetime(request.query_params["at"])
+            except ValueError:
+                # Well formed but not a real date, e.g. February 30th.
+                when = None
+            if when is None:
+                return Response(
+                    {"detail": "Invalid 'at' datetime."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+        stock = inventory.stock_at([pk], when)[pk]
+        return Response({"product": pk, "at": when or timezone.now(), "stock": stock})
+
+
 class CustomerView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(customer_list_state)
+    @caching.cached_get
     def get(self, request):
-        customers = Customer.objects.filter(created_by=request.user).order_by("id")
+        customers = filtered_customers(request)
+
+        query = request.query_params.get("q", "").strip()
+        if query:
+            results = search.search(
+                customers, query, request.user, search_limit(request)
+            )
+            serializer = CustomerSerializer(
+                results, many=True, context={"request": request}
+            )
+            return Response(serializer.data)
 
         fetch_all = request.query_params.get("all", "false").lower() == "true"
         if fetch_all:
-            serializer = CustomerSerializer(customers, many=True)
-            return Response(serializer.data)
+            return stream_json_list(customers, CustomerSerializer, {"request": request})
 
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
-        paginated_customers = paginator.paginate_queryset(customers, request)
-        serializer = CustomerSerializer(paginated_customers, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginated_list(request, customers, CustomerSerializer, 10)
 
     def post(self, request):
-        print("User:", request)
-        print("Auth:", request)
+        logger.debug("Creating customer for user %s", request.user.pk)
         serializer = CustomerSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(created_by=request.user)
@@ -175,13 +480,15 @@ class CustomerDetailView(APIView):
         except Customer.DoesNotExist:
             return None
 
+    @conditional_get(customer_detail_state)
+    @caching.cached_get
     def get(self, request, pk):
-        customer = self.get_object(pk, request.user)
+        customer = customer_queryset(request).filter(pk=pk).first()
         if not customer:
             return Response(
                 {"detail": "Customer not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        serializer = CustomerSerializer(customer)
+        serializer = CustomerSerializer(customer, context={"request": request})
         return Response(serializer.data)
 
     def put(self, request, pk):
@@ -193,6 +500,9 @@ class CustomerDetailView(APIView):
         serializer = CustomerSerializer(customer, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            prefetch_related_objects(
+                [customer], *CustomerSerializer.prefetch_related_fields["orders"]()
+            )
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -209,48 +519,63 @@ class CustomerDetailView(APIView):
 class OrderView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(order_list_state)
     def get(self, request):
-        orders = Order.objects.filter(created_by=request.user).order_by("id")
+        orders = filtered_orders(request)
 
         fetch_all = request.query_params.get("all", "false").lower() == "true"
-        status_param = request.query_params.get("status")
-
-        if status_param and status_param.lower() != "all":
-            orders = orders.filter(status=status_param.lower())
 
         if fetch_all:
-            serializer = OrderSerializer(orders, many=True)
-            return Response(serializer.data)
+            return stream_json_list(orders, OrderSerializer, {"request": request})
 
-        paginator = PageNumberPagination()
-        paginator.page_size = 4
-        paginated_orders = paginator.paginate_queryset(orders, request)
-        serializer = OrderSerializer(paginated_orders, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginated_list(request, orders, OrderSerializer, 4)
 
     def post(self, request):
         serializer = OrderSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
-            order = serializer.save()
-
-            for item in order.items.all():
-                product = item.product
-                product.units_sold += item.quantity
-                product.save()
-
+            serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class OrderBulkView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        entries = request.data
+        if isinstance(entries, dict):
+            entries = entries.get("orders")
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {"detail": "Expected a non-empty list of orders."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(entries) > BULK_ORDER_LIMIT:
+            return Response(
+                {"detail": f"At most {BULK_ORDER_LIMIT} orders per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = bulk.create_orders(request.user, entries)
+        created = sum(1 for result in results if result["status"] == "created")
+        return Response(
+            {
+                "created": created,
+                "failed": len(results) - created,
+                "results": results,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class RecentOrdersView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional_get(recent_orders_state)
     def get(self, request):
-        orders = Order.objects.filter(created_by=request.user).order_by("-created_at")[
-            :10
-        ]
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        orders = row_list(request, order_queryset(request), OrderSerializer)
+        orders = orders.order_by("-created_at")[:10]
+        return Response(serialize_list(request, orders, OrderSerializer))
 
 
 class OrderDetailView(APIView):
@@ -262,13 +587,14 @@ class OrderDetailView(APIView):
         except Order.DoesNotExist:
             return None
 
+    @conditional_get(order_detail_state)
     def get(self, request, pk):
-        order = self.get_object(pk, request.user)
+        order = order_queryset(request).filter(pk=pk).first()
         if not order:
             return Response(
                 {"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        serializer = OrderSerializer(order)
+        serializer = OrderSerializer(order, context={"request": request})
         return Response(serializer.data)
 
     def put(self, request, pk):
@@ -291,5 +617,149 @@ class OrderDetailView(APIView):
             return Response(
                 {"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        order.delete()
+        with transaction.atomic():
+            prefetch_related_objects([order], "items")
+            rollups.record_order(order, sign=-1)
+            # Canceled orders already gave their stock back.
+            if order.status != Order.CANCELED:
+                returned = defaultdict(int)
+                for item in order.items.all():
+                    returned[item.product_id] -= item.quantity
+                products = inventory.lock_products(returned, order.created_by_id)
+                inventory.apply_stock_deltas(returned, products)
+                inventory.record_movements(
+                    returned, order.created_by_id, StockMovement.CANCELLATION
+                )
+            order.delete()
+            totals.refresh_customers([order.customer_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StockAlertView(APIView):
+    """Low-stock alerts after ``?after=<id>``, oldest first; the latest ones without it.
+
+    Polling with the returned ``last`` id is one range read of the
+    ``(created_by, id)`` index.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        alerts = StockAlert.objects.filter(created_by=request.user).select_related(
+            "product"
+        )
+        try:
+            after = int(request.query_params["after"])
+        except (KeyError, ValueError):
+            after = None
+        if after is None:
+            rows = list(alerts.order_by("-id")[:ALERT_LIMIT])[::-1]
+        else:
+            rows = list(alerts.filter(id__gt=after).order_by("id")[:ALERT_LIMIT])
+        return Response(
+            {
+                "results": StockAlertSerializer(rows, many=True).data,
+                "last": rows[-1].id if rows else after,
+            }
+        )
+
+
+class CacheStatsView(APIView):
+    """Cache hit rates of this process, across tenants; staff only."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(caching.stats())
+
+
+def dashboard_queries(user):
+    """The dashboard's queries as {name: (queryset, aggregates)}.
+
+    ``aggregates`` are the ``aggregate()`` arguments; with None the
+    queryset's rows are read as they are.
+    """
+    month_start = timezone.localtime().replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    orders = Order.objects.filter(created_by=user)
+    sales = DailySales.objects.filter(created_by=user)
+    return {
+        "revenue_this_month": (
+            sales.filter(day__gte=month_start.date()),
+            {"total": Sum("revenue")},
+        ),
+        "orders_this_month": (
+            orders.filter(date__gte=month_start),
+            {"count": Count("id")},
+        ),
+        "monthly_revenue": (
+            sales.annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(revenue=Sum("revenue"))
+            .order_by("month"),
+            None,
+        ),
+        "orders_by_status": (orders.values("status").annotate(count=Count("id")), None),
+        "total_customers": (
+            Customer.objects.filter(created_by=user),
+            {"count": Count("id")},
+        ),
+        "products": (
+            Product.objects.filter(created_by=user),
+            {
+                "total": Count("id"),
+                "active": Count("id", filter=Q(stock__gt=0)),
+                "low_stock": Count("id", filter=LOW_STOCK),
+                "out_of_stock": Count("id", filter=Q(stock=0)),
+            },
+        ),
+    }
+
+
+def dashboard_response(results):
+    """The dashboard body from the evaluated ``dashboard_queries()``."""
+    orders_by_status = {key: 0 for key, _ in Order.STATUS_CHOICES}
+    for row in results["orders_by_status"]:
+        orders_by_status[row["status"]] = row["count"]
+    return {
+        "orders_this_month": results["orders_this_month"]["count"],
+        "revenue_this_month": results["revenue_this_month"]["total"] or 0,
+        "monthly_revenue": [
+            {"month": row["month"].strftime("%Y-%m"), "revenue": row["revenue"]}
+            for row in results["monthly_revenue"]
+        ],
+        "orders_by_status": orders_by_status,
+        "total_customers": results["total_customers"]["count"],
+        "products": results["products"],
+    }
+
+
+def dashboard_summary(user):
+    return dashboard_response(
+        {
+            name: (
+                list(queryset)
+                if aggregates is None
+                else queryset.aggregate(**aggregates)
+            )
+            for name, (queryset, aggregates) in dashboard_queries(user).items()
+        }
+    )
+
+
+async def adashboard_summary(user):
+    results = {}
+    for name, (queryset, aggregates) in dashboard_queries(user).items():
+        if aggregates is None:
+            results[name] = [row async for row in queryset]
+        else:
+            results[name] = await queryset.aaggregate(**aggregates)
+    return dashboard_response(results)
+
+
+class DashboardSummaryView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response(dashboard_summary(request.user))
@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +51,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = "api.User"
 
 MIDDLEWARE = [
+    "api.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,10 +86,44 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite connection tuning, chosen with IOMS_SQLITE_PROFILE. The pragmas run
+# on every new connection through the backend's init_command.
+# - "default": Django's defaults (rollback journal, one connection per request).
+# - "production": WAL so readers never wait for the writer, synchronous=NORMAL
+#   (safe with WAL; only the last commits can be lost on power failure), a
+#   64 MB page cache, 256 MB of memory-mapped I/O, BEGIN IMMEDIATE so writers
+#   queue on the 20 s busy timeout instead of failing a lock upgrade, and
+#   connections kept open between requests.
+SQLITE_PROFILE = os.environ.get("IOMS_SQLITE_PROFILE", "default")
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "OPTIONS": {
+            "init_command": (
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA cache_size=-64000;"
+                "PRAGMA mmap_size=268435456;"
+                "PRAGMA temp_store=MEMORY;"
+            ),
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+        "CONN_MAX_AGE": int(os.environ.get("IOMS_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    },
+}
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise ImproperlyConfigured(
+        f"Unknown IOMS_SQLITE_PROFILE {SQLITE_PROFILE!r}; "
+        f"expected one of: {', '.join(SQLITE_PROFILES)}"
+    )
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("IOMS_SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        **SQLITE_PROFILES[SQLITE_PROFILE],
     }
 }
 
@@ -133,14 +172,96 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.StatelessJWTAuthentication",
+    ),
+    # orjson-backed JSON; MessagePack for "Accept: application/msgpack"
+    # when msgpack is installed.
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        *(["api.renderers.MessagePackRenderer"] if find_spec("msgpack") else []),
     ),
 }
 
+# StatelessJWTAuthentication re-reads a user's is_active flag at most this
+# often per process, for up to API_AUTH_USER_CACHE_SIZE recently seen users.
+API_AUTH_USER_TTL = int(os.environ.get("IOMS_AUTH_USER_TTL", 60))
+API_AUTH_USER_CACHE_SIZE = 10000
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
+# Responses cached by api.caching.cached_get are invalidated through a per-user
+# version key, so every worker must share the cache: locmem is only correct
+# with a single process. Set IOMS_CACHE_DIR to use a file-based cache instead;
+# versions are replaced with a single set(), never incr(), which that backend
+# cannot apply atomically across processes.
+if os.environ.get("IOMS_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["IOMS_CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ioms",
+        }
+    }
+
+API_CACHE_TIMEOUT = 300
+
+# Serve the read endpoints from the async views in api/async_views.py. Opt-in
+# (IOMS_ASYNC_VIEWS=1) and only for ASGI: they have not measured faster than
+# the sync views under uvicorn, and under WSGI every async view would be run
+# through its own event loop.
+API_ASYNC_VIEWS = os.environ.get("IOMS_ASYNC_VIEWS") == "1"
+
+# Live events for GET /api/events/. Served under ASGI only, where asgi.py
+# turns it on: under WSGI each open stream would hold a worker thread. The
+# broker is any class with publish() and subscribe() like
+# api.events.LocalBroker, which only reaches streams in its own process; run
+# one ASGI worker with it, or point IOMS_EVENTS_BROKER at a shared
+# implementation.
+API_EVENTS_STREAM = os.environ.get("IOMS_EVENTS_STREAM") == "1"
+API_EVENTS_BROKER = os.environ.get("IOMS_EVENTS_BROKER", "api.events.LocalBroker")
+API_EVENTS_QUEUE_SIZE = 1000
+API_EVENTS_HEARTBEAT = 15
+
+# Per-request SQL/serialize/render timings (Server-Timing header) and a JSON
+# log of requests slower than API_SLOW_REQUEST_MS. Off unless IOMS_PROFILING=1.
+API_PROFILING = os.environ.get("IOMS_PROFILING") == "1"
+API_SLOW_REQUEST_MS = int(os.environ.get("IOMS_SLOW_REQUEST_MS", 500))
+API_SLOW_QUERY_COUNT = 5
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json_line": {"format": '{"time": "%(asctime)s", "request": %(message)s}'},
+    },
+    "handlers": {
+        "slow_requests": {
+            "class": "logging.FileHandler",
+            "filename": os.environ.get(
+                "IOMS_SLOW_REQUEST_LOG", BASE_DIR / "slow_requests.log"
+            ),
+            "formatter": "json_line",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "api.profiling": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
     # "REFRESH_TOKEN_LIFETIME": timedelta(days=7),